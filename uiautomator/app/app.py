@@ -4,89 +4,285 @@ import traceback
 import io
 import contextlib
 import logging
+import queue
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QPushButton, QComboBox, QLineEdit, QTextEdit, QCheckBox, QFormLayout, QFrame
+    QPushButton, QComboBox, QLineEdit, QTextEdit, QCheckBox, QFormLayout, QFrame,
+    QTreeView, QAbstractItemView
 )
-from PyQt5.QtCore import Qt, QObject, QThread, pyqtSignal, pyqtSlot
-from PyQt5.QtGui import QFont
+from PyQt5.QtCore import (
+    Qt, QObject, QThread, QTimer, QAbstractItemModel, QModelIndex, QSortFilterProxyModel,
+    pyqtSignal, pyqtSlot
+)
+from PyQt5.QtGui import QFont, QColor, QIcon, QPainter, QPixmap
 
 from utils.mongo_helper import fetch_modules
-from utils.test_parser import fetch_testcases
-from utils import logger
+from utils.test_parser import fetch_test_tree
+from utils import logger, notifier
 
 log = logger.setup_logger()
 
 
-class ReportWorker(QObject):
-    finished = pyqtSignal(str)
+STATUS_COLORS = {
+    "queued": "#94a3b8",
+    "running": "#3b82f6",
+    "passed": "#22c55e",
+    "failed": "#ef4444",
+}
 
-    def __init__(self, module_name, test_case_name, method, email, notify):
-        super().__init__()
-        self.module_name = module_name
-        self.test_case_name = test_case_name
-        self.method = method
-        self.email = email
-        self.notify = notify
 
-    @pyqtSlot()
-    def run(self):
-        buffer = io.StringIO()
-        stream_handler = logging.StreamHandler(buffer)
-        stream_handler.setFormatter(logging.Formatter('%(message)s'))
-        log.addHandler(stream_handler)
+def run_test_case(module_name, class_name, test_case_name, method, email, notify):
+    buffer = io.StringIO()
+    stream_handler = logging.StreamHandler(buffer)
+    stream_handler.setFormatter(logging.Formatter('%(message)s'))
+    log.addHandler(stream_handler)
 
+    passed = False
+    try:
         try:
-            try:
-                mod = __import__(f"tests.{self.module_name}", fromlist=[""])
-            except ImportError:
-                raise ImportError(f"Module 'tests.{self.module_name}' not found.")
-
-            test_func = None
-            if hasattr(mod, self.test_case_name):
-                test_func = getattr(mod, self.test_case_name)
-            else:
-                for attr_name in dir(mod):
-                    attr = getattr(mod, attr_name)
-                    if isinstance(attr, type) and hasattr(attr, self.test_case_name):
-                        instance = attr()
-                        test_func = getattr(instance, self.test_case_name)
-                        break
-
-            if test_func is None or not callable(test_func):
-                raise AttributeError(f"Test case '{self.test_case_name}' not found in module '{self.module_name}'.")
-
-            with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
-                test_func()
-
-            output = buffer.getvalue()
-            result = f"""
-[Module]        {self.module_name}
-[Test Case]     {self.test_case_name}
-[Method]        {self.method}
-[Email]         {self.email}
-[Notify]        {', '.join(self.notify) if self.notify else 'None'}
+            mod = __import__(f"tests.{module_name}", fromlist=[""])
+        except ImportError:
+            raise ImportError(f"Module 'tests.{module_name}' not found.")
+
+        test_func = None
+        if class_name and hasattr(mod, class_name):
+            instance = getattr(mod, class_name)()
+            test_func = getattr(instance, test_case_name, None)
+        elif hasattr(mod, test_case_name):
+            test_func = getattr(mod, test_case_name)
+        else:
+            for attr_name in dir(mod):
+                attr = getattr(mod, attr_name)
+                if isinstance(attr, type) and hasattr(attr, test_case_name):
+                    instance = attr()
+                    test_func = getattr(instance, test_case_name)
+                    break
+
+        if test_func is None or not callable(test_func):
+            raise AttributeError(f"Test case '{test_case_name}' not found in module '{module_name}'.")
+
+        with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+            test_func()
+
+        passed = True
+        output = buffer.getvalue()
+        result = f"""
+[Module]        {module_name}
+[Test Case]     {test_case_name}
+[Method]        {method}
+[Email]         {email}
+[Notify]        {', '.join(notify) if notify else 'None'}
 
 ✅ Output:
 {output.strip()}
-            """
-        except Exception:
-            result = f"""
-[Module]        {self.module_name}
-[Test Case]     {self.test_case_name}
+        """
+    except Exception:
+        result = f"""
+[Module]        {module_name}
+[Test Case]     {test_case_name}
 ❌ Error:
 {traceback.format_exc()}
-            """
-        finally:
-            log.removeHandler(stream_handler)
-            buffer.close()
+        """
+    finally:
+        log.removeHandler(stream_handler)
+        buffer.close()
 
-        self.finished.emit(result.strip())
+    return passed, result.strip()
+
+
+class ReportWorker(QObject):
+    # Runs queued jobs one after another on its own thread
+    started = pyqtSignal(int)
+    finished = pyqtSignal(int, bool, str)
+
+    def __init__(self):
+        super().__init__()
+        self.jobs = queue.Queue()
+
+    def enqueue(self, job):
+        self.jobs.put(job)
+
+    def stop(self):
+        self.jobs.put(None)
+
+    @pyqtSlot()
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            self.started.emit(job["id"])
+            # Notices only go on the dispatcher's queue; sending never blocks the run
+            if "PRE" in job["notify"]:
+                notifier.get_notifier().pre(job["email"], job)
+            passed, result = run_test_case(
+                job["module"], job["class"], job["test"], job["method"], job["email"], job["notify"]
+            )
+            if "POST" in job["notify"]:
+                notifier.get_notifier().post(job["email"], job, passed, result)
+            self.finished.emit(job["id"], passed, result)
+
+
+class TreeLoader(QObject):
+    # Parses test modules off the UI thread so filtering never blocks typing
+    parsed = pyqtSignal(str, object)
+    done = pyqtSignal()
+
+    @pyqtSlot(list)
+    def load(self, module_names):
+        for name in module_names:
+            try:
+                groups = fetch_test_tree(name)
+            except (OSError, SyntaxError) as e:
+                log.error(f"[Tree] Could not parse tests of {name}: {e}")
+                groups = []
+            self.parsed.emit(name, groups)
+        self.done.emit()
+
+
+class TreeNode:
+    def __init__(self, kind, name, parent=None):
+        self.kind = kind            # "module", "class" or "test"
+        self.name = name
+        self.parent = parent
+        self.children = []
+        self.row = 0
+        self.loaded = kind != "module"
+        self.status = None
+        self.test_key = None        # (module, class, test) for tests
+
+    def add(self, child):
+        child.parent = self
+        child.row = len(self.children)
+        self.children.append(child)
+        return child
+
+
+class TestTreeModel(QAbstractItemModel):
+    """Modules -> classes -> tests. A module is only parsed when it is expanded;
+    a filter has the rest parsed in the background and added with add_parsed()."""
+
+    def __init__(self, modules, parent=None):
+        super().__init__(parent)
+        self.root = TreeNode("root", "")
+        for name in modules:
+            self.root.add(TreeNode("module", name))
+        self.icons = {status: self._status_icon(color) for status, color in STATUS_COLORS.items()}
+
+    @staticmethod
+    def _status_icon(color):
+        pixmap = QPixmap(12, 12)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setBrush(QColor(color))
+        painter.setPen(Qt.NoPen)
+        painter.drawEllipse(1, 1, 10, 10)
+        painter.end()
+        return QIcon(pixmap)
+
+    def node(self, index):
+        return index.internalPointer() if index.isValid() else self.root
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self.node(parent)
+        if column != 0 or row < 0 or row >= len(node.children):
+            return QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self.root:
+            return QModelIndex()
+        return self.createIndex(parent.row, 0, parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        return len(self.node(parent).children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.node(parent)
+        return not node.loaded or bool(node.children)
+
+    def canFetchMore(self, parent):
+        return not self.node(parent).loaded
+
+    def fetchMore(self, parent):
+        node = self.node(parent)
+        if node.loaded:
+            return
+        self._insert(parent, node, fetch_test_tree(node.name))
+
+    def _insert(self, parent, node, groups):
+        node.loaded = True
+        # Plain function modules (e.g. Message) need no class level
+        flatten = len(groups) == 1 and groups[0][0] is None
+        rows = len(groups[0][1]) if flatten else len(groups)
+        if not rows:
+            return
+        self.beginInsertRows(parent, 0, rows - 1)
+        for class_name, tests in groups:
+            if flatten:
+                holder = node
+            else:
+                holder = node.add(TreeNode("class", class_name or "(module)"))
+            for test in tests:
+                leaf = holder.add(TreeNode("test", test))
+                leaf.test_key = (node.name, class_name, test)
+        self.endInsertRows()
+
+    def unloaded(self):
+        return [node.name for node in self.root.children if not node.loaded]
+
+    def add_parsed(self, module_name, groups):
+        # Expanding the module may have loaded it while it was being parsed
+        for node in self.root.children:
+            if node.name == module_name and not node.loaded:
+                self._insert(self.createIndex(node.row, 0, node), node, groups)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role == Qt.DisplayRole:
+            return node.name
+        if role == Qt.ToolTipRole:
+            return node.name if node.kind == "test" else f"{node.kind}: {node.name}"
+        if role == Qt.DecorationRole and node.kind == "test" and node.status:
+            return self.icons[node.status]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def leaves(self, index):
+        node = self.node(index)
+        if not node.loaded:
+            self.fetchMore(index)
+        if node.kind == "test":
+            return [node]
+        found = []
+        for child in node.children:
+            found.extend(self.leaves(self.createIndex(child.row, 0, child)))
+        return found
+
+    def set_status(self, leaf, status):
+        leaf.status = status
+        index = self.createIndex(leaf.row, 0, leaf)
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
 
 
 class StunningUI(QMainWindow):
+    loadRequested = pyqtSignal(list)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Stunning UI Automator")
@@ -94,6 +290,8 @@ class StunningUI(QMainWindow):
         self.dark_mode = False
         self.applyLightTheme()
         self.initUI()
+        self.startTreeLoader()
+        self.startRunQueue()
 
     def initUI(self):
         main_layout = QHBoxLayout()
@@ -124,18 +322,30 @@ class StunningUI(QMainWindow):
         config_layout.setSpacing(20)
         font = QFont("Segoe UI", 14)
 
-        self.module = QComboBox()
-        self.module.setEditable(False)
-        self.module.setFont(font)
-        modules = fetch_modules()
-        self.module.addItems(modules if modules else ["No modules found"])
-
-        self.testcase = QComboBox()
-        self.testcase.setEditable(False)
-        self.testcase.setFont(font)
-        self.module.currentTextChanged.connect(self.update_testcases)
-        self.update_testcases(self.module.currentText())
-        self.testcase.setFixedWidth(400)
+        self.search = QLineEdit()
+        self.search.setPlaceholderText("🔍 Filter modules, classes and tests")
+        self.search.setFont(font)
+
+        self.tree_model = TestTreeModel(fetch_modules())
+        self.proxy = QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(self.tree_model)
+        self.proxy.setRecursiveFilteringEnabled(True)
+        self.proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+
+        self.tree = QTreeView()
+        self.tree.setModel(self.proxy)
+        self.tree.setHeaderHidden(True)
+        self.tree.setUniformRowHeights(True)
+        self.tree.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.tree.setFont(font)
+        self.tree.setMinimumSize(400, 300)
+
+        # Debounce typing so large trees are filtered once per pause, not per key
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(200)
+        self.filter_timer.timeout.connect(self.applyFilter)
+        self.search.textChanged.connect(self.filter_timer.start)
 
         self.method = QComboBox()
         self.method.setEditable(False)
@@ -157,15 +367,15 @@ class StunningUI(QMainWindow):
         notif_layout.addWidget(self.pre)
         notif_layout.addWidget(self.post)
 
-        self.btn = QPushButton("🚀 Launch Test")
-        self.btn.clicked.connect(self.generateReport)
+        self.btn = QPushButton("🚀 Launch Selection")
+        self.btn.clicked.connect(self.launchSelection)
         self.btn.setFont(QFont("Segoe UI", 14, QFont.Bold))
         self.btn.setFixedHeight(40)
 
         label_font = QFont("Segoe UI", 14, QFont.Bold)
 
-        config_layout.addRow(self.makeLabel("Module:", label_font), self.module)
-        config_layout.addRow(self.makeLabel("Test Case:", label_font), self.testcase)
+        config_layout.addRow(self.makeLabel("Search:", label_font), self.search)
+        config_layout.addRow(self.makeLabel("Tests:", label_font), self.tree)
         config_layout.addRow(self.makeLabel("Method:", label_font), self.method)
         config_layout.addRow(self.makeLabel("Email:", label_font), self.email)
         config_layout.addRow(self.makeLabel("Job Trigger Notifications:", label_font), notif_layout)
@@ -197,15 +407,25 @@ class StunningUI(QMainWindow):
         label.setStyleSheet("background-color: transparent;")
         return label
 
-    def update_testcases(self, module_name):
-        self.testcase.clear()
-        cases = fetch_testcases(module_name)
-        if cases:
-            self.testcase.addItems(cases)
-            for i, case in enumerate(cases):
-                self.testcase.setItemData(i, case, Qt.ToolTipRole)
-        else:
-            self.testcase.addItem("No test cases found")
+    def applyFilter(self):
+        text = self.search.text().strip()
+        unloaded = self.tree_model.unloaded()
+        if text and unloaded and not self.tree_loading:
+            # Filtering has to see inside modules that were never expanded;
+            # they join the filtered tree as the loader parses them
+            self.tree_loading = True
+            self.loadRequested.emit(unloaded)
+        self.proxy.setFilterFixedString(text)
+        if text:
+            self.tree.expandAll()
+
+    def onModuleParsed(self, module_name, groups):
+        self.tree_model.add_parsed(module_name, groups)
+        if self.search.text().strip():
+            self.tree.expandAll()
+
+    def onTreeLoaded(self):
+        self.tree_loading = False
 
     def toggleTheme(self):
         self.dark_mode = not self.dark_mode
@@ -218,10 +438,10 @@ class StunningUI(QMainWindow):
         self.setStyleSheet("""
             QMainWindow { background-color: #0f172a; }
             #SidebarFrame { background-color: #1e293b; }
-            QLabel, QLineEdit, QComboBox, QCheckBox, QTextEdit {
+            QLabel, QLineEdit, QComboBox, QCheckBox, QTextEdit, QTreeView {
                 color: #ffffff; background-color: #1e293b;
             }
-            QLineEdit, QComboBox, QTextEdit {
+            QLineEdit, QComboBox, QTextEdit, QTreeView {
                 border: 1px solid #374151; border-radius: 6px; padding: 6px;
             }
             QPushButton {
@@ -234,10 +454,10 @@ class StunningUI(QMainWindow):
         self.setStyleSheet("""
             QMainWindow { background-color: #ffffff; }
             #SidebarFrame { background-color: #bfdbfe; }
-            QLabel, QLineEdit, QComboBox, QCheckBox, QTextEdit {
+            QLabel, QLineEdit, QComboBox, QCheckBox, QTextEdit, QTreeView {
                 color: #0f172a; background-color: #f3f4f6;
             }
-            QLineEdit, QComboBox, QTextEdit {
+            QLineEdit, QComboBox, QTextEdit, QTreeView {
                 border: 1px solid #cbd5e1; border-radius: 6px; padding: 6px;
             }
             QPushButton {
@@ -246,39 +466,81 @@ class StunningUI(QMainWindow):
             QPushButton:hover { background-color: #2563eb; }
         """)
 
-    def generateReport(self):
-        # Disable the button to prevent rapid multiple clicks
-        self.btn.setEnabled(False)
-        self.report_output.setText("⏳ Launching test... please wait.")
+    def startTreeLoader(self):
+        self.tree_loading = False
+        self.loader_thread = QThread()
+        self.loader = TreeLoader()
+        self.loader.moveToThread(self.loader_thread)
+        self.loadRequested.connect(self.loader.load)
+        self.loader.parsed.connect(self.onModuleParsed)
+        self.loader.done.connect(self.onTreeLoaded)
+        self.loader_thread.start()
+
+    def startRunQueue(self):
+        self.jobs = {}
+        self.next_job_id = 0
+        self.thread = QThread()
+        self.worker = ReportWorker()
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.run)
+        self.worker.started.connect(self.onJobStarted)
+        self.worker.finished.connect(self.onJobFinished)
+        self.thread.start()
 
+    def launchSelection(self):
         notify = []
         if self.pre.isChecked():
           notify.append("PRE")
         if self.post.isChecked():
           notify.append("POST")
 
-        module_name = self.module.currentText()
-        test_case_name = self.testcase.currentText()
         method = self.method.currentText()
-        email = self.email.text()
-
-        self.thread = QThread()
-        self.worker = ReportWorker(module_name, test_case_name, method, email, notify)
-        self.worker.moveToThread(self.thread)
-
-        self.thread.started.connect(self.worker.run)
-        self.worker.finished.connect(self.report_output.setText)
-        self.worker.finished.connect(self.thread.quit)
-        self.worker.finished.connect(self.worker.deleteLater)
-        self.thread.finished.connect(self.thread.deleteLater)
-
-        # ✅ Define inside the method
-        def enable_button_after_finish():
-           self.btn.setEnabled(True)
-
-        self.thread.finished.connect(enable_button_after_finish)
-        # ✅ Also inside
-        self.thread.start()
+        email = self.email.text().strip()
+        if notify and not email:
+            self.report_output.append("⚠ Enter an email address to receive PRE/POST notifications.")
+            return
+        if notify and not notifier.get_notifier().host:
+            self.report_output.append("⚠ No SMTP host in config/config.yaml; PRE/POST emails will not be sent.")
+
+        leaves = []
+        seen = set()
+        for proxy_index in self.tree.selectionModel().selectedIndexes():
+            for leaf in self.tree_model.leaves(self.proxy.mapToSource(proxy_index)):
+                if id(leaf) not in seen:
+                    seen.add(id(leaf))
+                    leaves.append(leaf)
+
+        if not leaves:
+            self.report_output.append("⚠ Select at least one module, class or test.")
+            return
+
+        for leaf in leaves:
+            module_name, class_name, test_case_name = leaf.test_key
+            self.next_job_id += 1
+            self.jobs[self.next_job_id] = leaf
+            self.tree_model.set_status(leaf, "queued")
+            self.worker.enqueue({
+                "id": self.next_job_id, "module": module_name, "class": class_name,
+                "test": test_case_name, "method": method, "email": email, "notify": notify,
+            })
+        self.report_output.append(f"⏳ Queued {len(leaves)} test(s).")
+
+    def onJobStarted(self, job_id):
+        self.tree_model.set_status(self.jobs[job_id], "running")
+
+    def onJobFinished(self, job_id, passed, result):
+        leaf = self.jobs.pop(job_id)
+        self.tree_model.set_status(leaf, "passed" if passed else "failed")
+        self.report_output.append(result + "\n")
+
+    def closeEvent(self, event):
+        self.worker.stop()
+        self.thread.quit()
+        self.thread.wait(2000)
+        self.loader_thread.quit()
+        self.loader_thread.wait(2000)
+        notifier.get_notifier().stop()
+        super().closeEvent(event)
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
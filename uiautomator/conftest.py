@@ -0,0 +1,30 @@
+# conftest.py
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from utils import adb_backend  # noqa: E402
+
+pytest_plugins = [
+    "utils.state_scheduler",
+    "utils.device_snapshot",
+    "utils.resource_sampler",
+    "utils.exec_control",
+]
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("adb")
+    group.addoption("--adb-backend", choices=["real", "record", "replay"], default=None,
+                    help="Run adb commands against the device, record them, or replay a cassette")
+    group.addoption("--adb-cassette", default=None, help="Cassette file used by record/replay")
+    group.addoption("--adb-replay-latency", default=None,
+                    help="Simulated latency on replay: seconds per command or 'recorded'")
+
+
+def pytest_configure(config):
+    adb_backend.use(
+        config.getoption("--adb-backend"),
+        config.getoption("--adb-cassette"),
+        config.getoption("--adb-replay-latency"),
+    )
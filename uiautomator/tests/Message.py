@@ -1,12 +1,16 @@
-import subprocess
-import time
+import os
+import sys
 import csv
-import xml.etree.ElementTree as ET
 import re
+import time
 from datetime import datetime
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import adb_backend, config, device_snapshot, exec_control, log_archive, nav_graph, resource_sampler, sms_load, sms_verify, ui_dump  # noqa: E402
+
 RESULT_FILE = "result.csv"
-LOG_FILE = "sms_log.txt"
+MESSAGES_PACKAGE = "com.google.android.apps.messaging"
+MESSAGES_ACTIVITY = f"{MESSAGES_PACKAGE}/.ui.ConversationListActivity"
 
 def setup_csv():
     with open(RESULT_FILE, mode='w', newline='', encoding='utf-8') as file:
@@ -22,36 +26,30 @@ def log_result(test_id, desc, number, message, status, output):
             datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         ])
 
-def run_adb(command):
-    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+def run_adb(command, timeout=None):
+    # The screen may change under the navigator's feet
+    nav_graph.invalidate_all()
+    try:
+        result = adb_backend.run(command, timeout)
+    except (exec_control.DeadlineExceeded, exec_control.DeviceUnavailableError) as e:
+        return "", str(e)
     return result.stdout.strip(), result.stderr.strip()
 
 def click_send_button():
-    subprocess.run(["adb", "shell", "uiautomator", "dump"], stdout=subprocess.DEVNULL)
-    subprocess.run(["adb", "pull", "/sdcard/window_dump.xml"], stdout=subprocess.DEVNULL)
     try:
-        tree = ET.parse("window_dump.xml")
-        root = tree.getroot()
-        for node in root.iter("node"):
-            res_id = node.attrib.get("resource-id", "").lower()
-            text = node.attrib.get("text", "").lower()
-            if "send" in res_id or text == "send":
-                bounds = node.attrib.get("bounds")
-                coords = re.findall(r"\d+", bounds)
-                if len(coords) == 4:
-                    x1, y1, x2, y2 = map(int, coords)
-                    x = (x1 + x2) // 2
-                    y = (y1 + y2) // 2
-                    subprocess.run(["adb", "shell", "input", "tap", str(x), str(y)])
-                    return True
-        return False
+        root = ui_dump.dump()
+        center = ui_dump.find_center(root, ui_dump.is_send_button)
+        if center is None:
+            return False
+        adb_backend.run(["adb", "shell", "input", "tap", str(center[0]), str(center[1])])
+        return True
     except Exception:
         return False
 
 def is_valid_number(number):
     return re.fullmatch(r"[6-9]\d{9}", number.strip()) is not None
 
-def send_sms(phone_number, message, test_id, desc):
+def send_sms(phone_number, message, test_id, desc, batch=None):
     phone_number = phone_number.strip()
     message = message.strip()
 
@@ -64,7 +62,10 @@ def send_sms(phone_number, message, test_id, desc):
         log_result(test_id, desc, phone_number, message, "Fail", "Empty message not allowed")
         print(f"[❌] Cannot send empty message to {phone_number}")
         return
-    
+
+    verifier = sms_verify.get_verifier()
+    expectation = verifier.expect(phone_number, message)
+
     command = [
         "adb", "shell", "am", "start",
         "-a", "android.intent.action.SENDTO",
@@ -73,58 +74,91 @@ def send_sms(phone_number, message, test_id, desc):
         "--ez", "exit_on_sent", "true"
     ]
     out, err = run_adb(command)
-    time.sleep(5)
+    config.wait("send_wait")
     success = click_send_button()
 
     if not success:
         print("[!] Retrying click on send button...")
-        time.sleep(5)
+        config.wait("send_wait")
         success = click_send_button()
 
-    status = "Pass" if success else "Fail"
     output_msg = out if out else err
-    log_result(test_id, desc, phone_number, message, status, output_msg)
-    print(f"[{status}] Message {'sent to ' + phone_number if success else 'not sent'}")
+    if not success:
+        log_result(test_id, desc, phone_number, message, "Fail", f"Send button not found. {output_msg}")
+        print("[Fail] Message not sent")
+        return
+
+    if batch is not None:
+        # Verified together with the rest of the loop by verify_batch()
+        batch.append((expectation, test_id, desc, phone_number, message, output_msg))
+        return
+
+    _log_verification(expectation, verifier.verify(expectation), test_id, desc, phone_number, message, output_msg)
+
+def _log_verification(expectation, result, test_id, desc, phone_number, message, output_msg):
+    status = "Pass" if result == sms_verify.SENT else "Fail"
+    sms_id = expectation.row["id"] if expectation.row else "-"
+    log_result(test_id, desc, phone_number, message, status, f"Provider: {result} (_id {sms_id}). {output_msg}")
+    print(f"[{status}] Message to {phone_number}: {result}")
+
+def verify_batch(batch):
+    if not batch:
+        return
+    results = sms_verify.get_verifier().verify_all([entry[0] for entry in batch])
+    for (expectation, *details), result in zip(batch, results):
+        _log_verification(expectation, result, *details)
 
 def toggle_network(state):
     if state == "off":
-        subprocess.run(["adb", "shell", "settings", "put", "global", "airplane_mode_on", "1"])
-        subprocess.run(["adb", "shell", "am", "broadcast", "-a", "android.intent.action.AIRPLANE_MODE", "--ez", "state", "true"])
+        run_adb(["adb", "shell", "settings", "put", "global", "airplane_mode_on", "1"])
+        run_adb(["adb", "shell", "am", "broadcast", "-a", "android.intent.action.AIRPLANE_MODE", "--ez", "state", "true"])
     elif state == "on":
-        subprocess.run(["adb", "shell", "settings", "put", "global", "airplane_mode_on", "0"])
-        subprocess.run(["adb", "shell", "am", "broadcast", "-a", "android.intent.action.AIRPLANE_MODE", "--ez", "state", "false"])
-    time.sleep(2)
+        run_adb(["adb", "shell", "settings", "put", "global", "airplane_mode_on", "0"])
+        run_adb(["adb", "shell", "am", "broadcast", "-a", "android.intent.action.AIRPLANE_MODE", "--ez", "state", "false"])
+    config.wait("network_settle")
 
 def save_logcat():
-    with open(LOG_FILE, 'w', encoding='utf-8') as f:
-        subprocess.run("adb logcat -d", shell=True, stdout=f)
-    print("[✔] Logcat saved to sms_log.txt")
+    out, err = run_adb(["adb", "logcat", "-d", "-v", "threadtime"])
+    if not out:
+        print(f"[❌] Could not read logcat: {err}")
+        return
+    path = log_archive.archive_logcat("sms", out)
+    print(f"[✔] Logcat archived to {path}")
 
 def open_messages_and_search(contact):
-    print("[📲] Launching Messages app...")
-    subprocess.run(["adb", "shell", "am", "start", "-n", "com.google.android.apps.messaging/.ui.ConversationListActivity"])
-    time.sleep(2)
-    subprocess.run(["adb", "shell", "input", "keyevent", "84"])
-    time.sleep(1)
-    subprocess.run(["adb", "shell", "input", "text", contact])
-    time.sleep(2)
-    subprocess.run(["adb", "shell", "input", "keyevent", "66"])
-    time.sleep(2)
+    print("[📲] Opening Messages conversation list...")
+    nav = nav_graph.get_navigator(MESSAGES_PACKAGE)
+    # Skips the relaunch when the list is already showing, or backs out to it
+    nav.navigate_to("conversation_list", fallback=nav_graph.launch(MESSAGES_ACTIVITY))
+    nav.navigate_to("search", fallback=nav_graph.keyevent(84))
+    config.wait("ui_settle")
+    # Typed text is per-contact input, not navigation
+    run_adb(["adb", "shell", "input", "text", contact])
+    config.wait("text_settle")
+    run_adb(["adb", "shell", "input", "keyevent", "66"])
+    config.wait("launch_settle")
 
 def scroll_up():
-    subprocess.run(["adb", "shell", "input", "swipe", "500", "500", "500", "1600"])
+    run_adb(["adb", "shell", "input", "swipe", "500", "500", "500", "1600"])
 
 def scroll_down():
-    subprocess.run(["adb", "shell", "input", "swipe", "500", "1600", "500", "500"])
+    run_adb(["adb", "shell", "input", "swipe", "500", "1600", "500", "500"])
 
-def wait_for_device():
+def wait_for_device(timeout):
     print("[🔄] Waiting for device to be ready...")
-    while True:
-        result = subprocess.run(["adb", "shell", "getprop", "sys.boot_completed"], capture_output=True, text=True)
-        if result.stdout.strip() == "1":
-            print("[✅] Device boot completed.")
-            break
-        time.sleep(2)
+    # The device is expected to drop off adb while it reboots; keep that from
+    # opening its circuit breaker
+    deadline = time.monotonic() + timeout
+    with exec_control.expected_outage():
+        run_adb(["adb", "wait-for-device"], timeout=timeout)
+        while time.monotonic() < deadline:
+            out, _ = run_adb(["adb", "shell", "getprop", "sys.boot_completed"])
+            if out == "1":
+                print("[✅] Device boot completed.")
+                return True
+            config.wait("boot_poll")
+    print("[❌] Device did not finish booting in time.")
+    return False
 
 # ----------- Test Cases ----------- #
 
@@ -159,25 +193,28 @@ def test_special_characters():
 def test_multiple_recipients():
     numbers = input("Enter comma-separated numbers: ").split(',')
     message = input("Enter message: ")
+    batch = []
     for idx, num in enumerate(numbers):
-        send_sms(num.strip(), message, f"TC06_{idx+1}", "Send message to multiple recipients")
+        send_sms(num.strip(), message, f"TC06_{idx+1}", "Send message to multiple recipients", batch)
+    verify_batch(batch)
 
 def test_network_off():
     number = input("Enter number: ")
     message = input("Enter message: ")
-    toggle_network("off")
-    send_sms(number, message, "TC07", "Send message with network OFF")
-    toggle_network("on")
+    with device_snapshot.preserved():
+        toggle_network("off")
+        send_sms(number, message, "TC07", "Send message with network OFF")
 
 def test_without_wifi():
     number = input("Enter number: ")
     message = input("Enter message: ")
-    print("[!] Disabling mobile data and Wi-Fi...")
-    subprocess.run(["adb", "shell", "svc", "data", "disable"])
-    subprocess.run(["adb", "shell", "svc", "wifi", "disable"])
-    time.sleep(3)
-    send_sms(number, message, "TC08", "Send SMS without SIM or active network")
-    input("[!] Enable data/Wi-Fi manually and press Enter...")
+    with device_snapshot.preserved():
+        print("[!] Disabling mobile data and Wi-Fi...")
+        run_adb(["adb", "shell", "svc", "data", "disable"])
+        run_adb(["adb", "shell", "svc", "wifi", "disable"])
+        config.wait("data_off_settle")
+        send_sms(number, message, "TC08", "Send SMS without SIM or active network")
+    print("[✔] Data/Wi-Fi restored")
 
 def test_emoji_only():
     number = input("Enter number: ")
@@ -192,23 +229,29 @@ def test_combo_emoji_text_special():
 def test_after_reboot():
     number = input("Enter number: ")
     message = input("Enter message: ")
+    # Resolved while the device is still reachable
+    boot_timeout = config.timing("boot_timeout")
     print("[⚠] Rebooting device now...")
-    subprocess.run(["adb", "reboot"])
+    with exec_control.expected_outage():
+        run_adb(["adb", "reboot"])
     print("Waiting for device to reboot...")
-    wait_for_device()
-    time.sleep(10)
+    if not wait_for_device(boot_timeout):
+        log_result("TC11", "Send SMS after reboot", number, message, "Fail", "Device did not come back after reboot")
+        return
+    config.wait("boot_settle")
     print("[📲] Re-opening Messages app after reboot...")
-    subprocess.run(["adb", "shell", "am", "start", "-n", "com.google.android.apps.messaging/.ui.ConversationListActivity"])
-    time.sleep(20)
+    run_adb(["adb", "shell", "am", "start", "-n", MESSAGES_ACTIVITY])
+    config.wait("post_reboot_wait")
     send_sms(number, message, "TC11", "Send SMS after reboot")
 
 def test_while_heavy_app_running():
     number = input("Enter number: ")
     message = input("Enter message: ")
     print("[📱] Launching YouTube as heavy app...")
-    subprocess.run(["adb", "shell", "monkey", "-p", "com.google.android.youtube", "-c", "android.intent.category.LAUNCHER", "1"])
-    time.sleep(10)
-    send_sms(number, message, "TC12", "Send SMS while heavy app is running")
+    run_adb(["adb", "shell", "monkey", "-p", "com.google.android.youtube", "-c", "android.intent.category.LAUNCHER", "1"])
+    config.wait("heavy_app_settle")
+    with resource_sampler.sampling("TC12"):
+        send_sms(number, message, "TC12", "Send SMS while heavy app is running")
 
 def test_scroll_older():
     contact = input("Enter contact name or number: ")
@@ -216,7 +259,7 @@ def test_scroll_older():
     print("Scrolling up to older messages...")
     for _ in range(3):
         scroll_up()
-        time.sleep(1)
+        config.wait("ui_settle")
 
 def test_scroll_newer():
     contact = input("Enter contact name or number: ")
@@ -224,7 +267,7 @@ def test_scroll_newer():
     print("Scrolling down to newer messages...")
     for _ in range(3):
         scroll_down()
-        time.sleep(1)
+        config.wait("ui_settle")
 
 def test_search_contact():
     contact = input("Enter contact name or number: ")
@@ -234,19 +277,22 @@ def test_search_contact():
 def test_battery_saver_on():
     number = input("Enter number: ")
     message = "Test SMS with Battery Saver mode ON."
-    print("[⚡] Enabling battery saver...")
-    subprocess.run(["adb", "shell", "settings", "put", "global", "low_power", "1"])
-    time.sleep(2)
-    send_sms(number, message, "TC17", "Send SMS with Battery Saver mode ON")
-    subprocess.run(["adb", "shell", "settings", "put", "global", "low_power", "0"])  # Reset
+    with device_snapshot.preserved():
+        print("[⚡] Enabling battery saver...")
+        run_adb(["adb", "shell", "settings", "put", "global", "low_power", "1"])
+        config.wait("settings_settle")
+        with resource_sampler.sampling("TC17"):
+            send_sms(number, message, "TC17", "Send SMS with Battery Saver mode ON")
 
 
 def test_spam_same_number():
     number = input("Enter number: ")
     message = "Spam message"
+    batch = []
     for i in range(5):
-        send_sms(number, f"{message} #{i+1}", f"TC39_{i+1}", "Send repeated messages to same number")
-        time.sleep(1)
+        send_sms(number, f"{message} #{i+1}", f"TC39_{i+1}", "Send repeated messages to same number", batch)
+        config.wait("ui_settle")
+    verify_batch(batch)
 
 def test_url():
     number = input("Enter number: ")
@@ -254,6 +300,37 @@ def test_url():
     message = f"Check this out: {url}"
     send_sms(number, message, "TC19", "Send SMS with URL and test auto-link behavior")
 
+def test_sms_load():
+    numbers = [n.strip() for n in input("Enter comma-separated recipient numbers: ").split(',') if n.strip()]
+    invalid = [n for n in numbers if not is_valid_number(n)]
+    if not numbers or invalid:
+        print(f"[❌] Invalid recipient(s): {', '.join(invalid) or 'none given'}")
+        return
+    serials = [s.strip() for s in input("Device serials (comma-separated, blank = default device): ").split(',') if s.strip()]
+    rate = float(input("Target messages per second (all devices): ") or "0.5")
+    count = int(input("Total messages: ") or "20")
+    mode = (input("Mode [open/closed]: ").strip() or "open").lower()
+    window = int(input("Closed-loop window per device: ") or "3") if mode == "closed" else 3
+
+    try:
+        run = sms_load.LoadRun(serials, numbers, rate, count, mode, window)
+    except ValueError as e:
+        print(f"[❌] {e}")
+        return
+    report = run.run()
+    path = run.write_csv()
+
+    sent_ms = report["queued_to_sent_ms"]
+    delivered_ms = report["queued_to_delivered_ms"]
+    print(f"[📊] {report['messages']} messages, {report['sent']} sent, {report['delivered']} delivered, {report['failed']} failed")
+    print(f"     Issue rate {report['issue_rate']}/s (target {rate}/s), sent throughput {report['sent_throughput']}/s")
+    print(f"     Queued->sent p50={sent_ms.get('p50')}ms p90={sent_ms.get('p90')}ms p99={sent_ms.get('p99')}ms")
+    print(f"     Queued->delivered p50={delivered_ms.get('p50')}ms p90={delivered_ms.get('p90')}ms p99={delivered_ms.get('p99')}ms")
+    print(f"[✔] Per-message results saved to {path}")
+    status = "Pass" if report["sent"] == report["messages"] else "Fail"
+    log_result("TC20", "SMS load mode", ",".join(numbers), f"{count} msgs @ {rate}/s ({mode} loop)", status,
+               f"sent {report['sent']}/{report['messages']}, delivered {report['delivered']}")
+
 
 def All():
     test_valid_number()
@@ -304,7 +381,8 @@ def main():
         print("17. Send Message while battery saver is on")
         print("18. send spam msg")
         print("19. msg with url")
-        print("20.Exit..")
+        print("20. SMS load mode")
+        print("21.Exit..")
 
         if choice == "1":
             test_valid_number()
@@ -346,6 +424,8 @@ def main():
             test_url()
             
         elif choice == "20":
+            test_sms_load()
+        elif choice == "21":
             print("Exiting test menu.")
             break
         else:
@@ -0,0 +1,114 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import adb_backend  # noqa: E402
+
+DUMP = b'<?xml version="1.0"?><hierarchy><node text="Send" /></hierarchy>'
+
+
+class FakeAdb:
+    """Stands in for exec_control.execute while recording."""
+
+    def __init__(self):
+        self.calls = []
+        self.outputs = {"getprop": ["Pixel 7\n"], "boot": ["\n", "1\n"]}
+
+    def __call__(self, cmd, timeout=None):
+        self.calls.append(cmd)
+        if "pull" in cmd:
+            with open(cmd[-1], "wb") as f:
+                f.write(DUMP)
+            return subprocess.CompletedProcess(cmd, 0, "1 file pulled\n", "")
+        key = "boot" if "sys.boot_completed" in cmd else "getprop"
+        out = self.outputs[key].pop(0) if len(self.outputs[key]) > 1 else self.outputs[key][0]
+        return subprocess.CompletedProcess(cmd, 0, out, "")
+
+
+@pytest.fixture
+def cassette(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(adb_backend, "_backend", None)
+    monkeypatch.setattr(adb_backend.atexit, "register", lambda fn: None)
+    return str(tmp_path / "cassettes" / "run.jsonl")
+
+
+def record(cassette, monkeypatch):
+    fake = FakeAdb()
+    monkeypatch.setattr(adb_backend.exec_control, "execute", fake)
+    backend = adb_backend.use("record", cassette)
+    assert adb_backend.is_live()
+    assert adb_backend.run(["adb", "shell", "getprop", "ro.product.model"]).stdout == "Pixel 7\n"
+    adb_backend.run(["adb", "shell", "getprop", "sys.boot_completed"])
+    adb_backend.run(["adb", "shell", "getprop", "sys.boot_completed"])
+    adb_backend.run(["adb", "pull", "/sdcard/window_dump.xml", "dump.xml"])
+    backend.close()
+    return fake
+
+
+def test_pull_destination():
+    assert adb_backend._pull_destination(["adb", "shell", "ls"]) is None
+    assert adb_backend._pull_destination(["adb", "pull"]) is None
+    assert adb_backend._pull_destination(["adb", "-s", "S1", "pull", "-a", "/sdcard/a.xml", "b.xml"]) == "b.xml"
+    assert adb_backend._pull_destination(["adb", "pull", "/sdcard/a.xml"]) == "a.xml"
+
+
+def test_pull_destination_into_a_directory(tmp_path):
+    assert adb_backend._pull_destination(["adb", "pull", "/sdcard/a.xml", str(tmp_path)]) == \
+        os.path.join(str(tmp_path), "a.xml")
+
+
+def test_record_then_replay_round_trip(cassette, monkeypatch):
+    record(cassette, monkeypatch)
+    assert os.path.exists(cassette + ".idx")
+    os.remove("dump.xml")
+
+    def no_device(cmd, timeout=None):
+        raise AssertionError("replay must not reach adb")
+
+    monkeypatch.setattr(adb_backend.exec_control, "execute", no_device)
+    adb_backend.use("replay", cassette)
+    assert not adb_backend.is_live()
+    assert adb_backend.run(["adb", "shell", "getprop", "ro.product.model"]).stdout == "Pixel 7\n"
+
+    # Repeated commands replay in recorded order, then the last answer repeats
+    boot = ["adb", "shell", "getprop", "sys.boot_completed"]
+    assert [adb_backend.run(boot).stdout for _ in range(3)] == ["\n", "1\n", "1\n"]
+
+    # Pulled files are restored from the cassette
+    assert adb_backend.run(["adb", "pull", "/sdcard/window_dump.xml", "dump.xml"]).returncode == 0
+    with open("dump.xml", "rb") as f:
+        assert f.read() == DUMP
+
+
+def test_replay_without_index_scans_the_cassette(cassette, monkeypatch):
+    record(cassette, monkeypatch)
+    os.remove(cassette + ".idx")
+    adb_backend.use("replay", cassette)
+    assert adb_backend.run(["adb", "shell", "getprop", "ro.product.model"]).stdout == "Pixel 7\n"
+
+
+def test_replay_miss_raises(cassette, monkeypatch):
+    record(cassette, monkeypatch)
+    adb_backend.use("replay", cassette)
+    with pytest.raises(adb_backend.CassetteMissError):
+        adb_backend.run(["adb", "shell", "getprop", "ro.build.fingerprint"])
+
+
+def test_settle_is_skipped_on_replay_only(cassette, monkeypatch):
+    record(cassette, monkeypatch)
+    sleeps = []
+    monkeypatch.setattr(adb_backend.time, "sleep", sleeps.append)
+    adb_backend.use("record", cassette)
+    adb_backend.settle(2)
+    adb_backend.use("replay", cassette)
+    adb_backend.settle(3)
+    assert sleeps == [2]
+
+
+def test_unknown_backend_is_rejected(cassette):
+    with pytest.raises(ValueError):
+        adb_backend.use("mock")
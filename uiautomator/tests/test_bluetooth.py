@@ -1,27 +1,38 @@
 import os
 import sys
-import time
 import pytest
 import traceback
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from utils import adb_utils, logger  # noqa: E402
+from utils import adb_utils, bt_metrics, log_archive, logger, state_scheduler  # noqa: E402
+from utils.state_scheduler import tracker  # noqa: E402
 
 log = logger.setup_logger()
 
+BT_OFF = {"bluetooth": "off"}
+BT_ON = {"bluetooth": "on"}
+
+state_scheduler.register_transition("bluetooth", "off", ['shell', 'svc', 'bluetooth', 'disable'])
+state_scheduler.register_transition("bluetooth", "on", ['shell', 'svc', 'bluetooth', 'enable'])
+device_state = pytest.mark.device_state
+
+
+@pytest.fixture(scope="module", autouse=True)
+def bluetooth_off_after_module():
+    yield
+    log.info(f"[State] {tracker.transitions_run} Bluetooth transitions issued by fixtures")
+    tracker.ensure(BT_OFF)
+    summary = bt_metrics.summarize()
+    if summary:
+        log.info(f"[Metrics] Bluetooth latency summary written to {bt_metrics.SUMMARY_FILE}")
+
 
 @pytest.fixture(autouse=True)
-def setup_and_teardown(request):
+def setup_and_teardown(request, device_state):
     test_name = request.node.name
-    timestamp = time.strftime("%Y-%m-%d_%H-%M-%S")
-
-    log_dir = r"C:\Users\DELL\internproject1\uiautomator\logs"
-    os.makedirs(log_dir, exist_ok=True)
-    log_filename = os.path.join(log_dir, f"{test_name}_{timestamp}.log")
 
     try:
-        log.info(f"[Precondition] Ensuring Bluetooth is OFF for {test_name}")
-        adb_utils.run_adb_command(['shell', 'svc', 'bluetooth', 'disable'])
+        log.info(f"[Precondition] Bluetooth state for {test_name}: {tracker.get('bluetooth') or 'unknown'}")
         adb_utils.run_adb_command(['shell', 'logcat', '-c'])
     except Exception as e:
         log.error(f"Precondition failed: {e}")
@@ -30,12 +41,12 @@ def setup_and_teardown(request):
     yield
 
     try:
-        logcat_output = adb_utils.run_adb_command(['shell', 'logcat', '-d'])
-        with open(log_filename, "w", encoding="utf-8") as log_file:
-            log_file.write(logcat_output)
+        logcat_output = adb_utils.run_adb_command(['shell', 'logcat', '-d', '-v', 'threadtime'])
+        log_filename = log_archive.archive_logcat(test_name, logcat_output)
+        for kind, latency_ms in bt_metrics.record(test_name, logcat_output, adb_utils.get_device_info()):
+            log.info(f"[Metrics] Bluetooth {kind} took {latency_ms} ms")
 
-        log.info(f"[Postcondition] Bluetooth OFF. Log saved: {log_filename}")
-        adb_utils.run_adb_command(['shell', 'svc', 'bluetooth', 'disable'])
+        log.info(f"[Postcondition] Log saved: {log_filename}")
     except Exception as e:
         log.error(f"Postcondition failed: {e}")
         log.error(traceback.format_exc())
@@ -55,17 +66,20 @@ def log_and_run(description, cmd):
 
 class TestBluetoothControl:
 
+    @device_state(requires=BT_OFF, leaves=BT_ON)
     def test_01_enable_bluetooth(self):
         log_and_run("Enable Bluetooth", ['shell', 'svc', 'bluetooth', 'enable'])
         output = adb_utils.run_adb_command(['shell', 'dumpsys', 'bluetooth_manager'])
         assert "enabled" in output.lower()
 
+    @device_state(leaves=BT_OFF)
     def test_02_disable_bluetooth(self):
         log_and_run("Enable Bluetooth", ['shell', 'svc', 'bluetooth', 'enable'])
         log_and_run("Disable Bluetooth", ['shell', 'svc', 'bluetooth', 'disable'])
         output = adb_utils.run_adb_command(['shell', 'dumpsys', 'bluetooth_manager'])
         assert "enabled" not in output.lower()
 
+    @device_state(leaves=BT_ON)
     def test_03_toggle_bluetooth(self):
         log_and_run("Toggle ON", ['shell', 'svc', 'bluetooth', 'enable'])
         log_and_run("Toggle OFF", ['shell', 'svc', 'bluetooth', 'disable'])
@@ -73,14 +87,17 @@ class TestBluetoothControl:
         output = adb_utils.run_adb_command(['shell', 'dumpsys', 'bluetooth_manager'])
         assert "enabled" in output.lower()
 
+    @device_state()
     def test_04_check_bluetooth_mac(self):
         mac = log_and_run("Get Bluetooth MAC", ['shell', 'settings', 'get', 'secure', 'bluetooth_address'])
         assert ":" in mac.strip()
 
+    @device_state()
     def test_05_check_bt_state_with_dumpsys(self):
         output = log_and_run("Check Bluetooth state", ['shell', 'dumpsys', 'bluetooth_manager'])
         assert any(state in output.lower() for state in ["enabled", "disabled"])
 
+    @device_state(leaves=BT_ON)
     def test_06_scan_for_devices(self):
         log_and_run("Start Bluetooth", ['shell', 'svc', 'bluetooth', 'enable'])
         output = log_and_run("Start scanning", [
@@ -88,18 +105,21 @@ class TestBluetoothControl:
         ])
         assert "broadcast completed" in output.lower() or "result=" in output.lower()
 
+    @device_state()
     def test_07_check_discoverable_mode(self):
         state = log_and_run("Check discoverable mode", [
             'shell', 'settings', 'get', 'global', 'bluetooth_discoverable_timeout'
         ])
         assert state.strip().isdigit()
 
+    @device_state()
     def test_08_make_device_discoverable(self):
         output = log_and_run("Make device discoverable", [
             'shell', 'am', 'start', '-a', 'android.bluetooth.adapter.action.REQUEST_DISCOVERABLE'
         ])
         assert "cmp=" in output.lower() or "starting" in output.lower()
 
+    @device_state()
     def test_09_check_paired_devices(self):
         output = log_and_run("Check paired devices", [
             'shell', 'cmd', 'bluetooth_manager', 'getPairedDevices'
@@ -107,6 +127,7 @@ class TestBluetoothControl:
         log.info(f"Paired Devices: {output}")
         assert output and output.strip()
 
+    @device_state(requires=BT_OFF, leaves=BT_ON)
     def test_10_enable_bt_via_settings_put(self):
         log_and_run("Enable BT via settings", [
             'shell', 'settings', 'put', 'global', 'bluetooth_on', '1'
@@ -114,32 +135,38 @@ class TestBluetoothControl:
         output = adb_utils.run_adb_command(['shell', 'dumpsys', 'bluetooth_manager'])
         assert "enabled" in output.lower()
 
+    @device_state()
     def test_11_check_bt_stack(self):
         output = log_and_run("Get Bluetooth stack info", ['shell', 'dumpsys', 'bluetooth_manager'])
         assert "bluetoothmanager" in output.lower()
 
+    @device_state()
     def test_12_trigger_bt_settings_ui(self):
         output = log_and_run("Trigger Bluetooth UI", [
             'shell', 'am', 'start', '-a', 'android.settings.BLUETOOTH_SETTINGS'
         ])
         assert "cmp=" in output.lower() or "starting" in output.lower()
 
+    @device_state(requires=BT_ON, leaves=BT_OFF)
     def test_13_bt_off_state_check(self):
         log_and_run("Turn off Bluetooth", ['shell', 'svc', 'bluetooth', 'disable'])
         output = log_and_run("Check Bluetooth off state", ['shell', 'dumpsys', 'bluetooth_manager'])
         assert "enabled" not in output.lower()
 
+    @device_state(leaves=BT_ON)
     def test_14_bt_logcat_filter(self):
         log_and_run("Start Bluetooth", ['shell', 'svc', 'bluetooth', 'enable'])
         output = log_and_run("Capture Bluetooth logs", ['shell', 'logcat', '-d'])
         assert "bluetooth" in output.lower() or len(output.strip()) > 0
 
+    @device_state(requires=BT_ON, leaves=BT_ON)
     def test_15_restart_bluetooth_adapter(self):
         log_and_run("Disable Bluetooth", ['shell', 'svc', 'bluetooth', 'disable'])
         log_and_run("Enable Bluetooth", ['shell', 'svc', 'bluetooth', 'enable'])
         output = adb_utils.run_adb_command(['shell', 'dumpsys', 'bluetooth_manager'])
         assert "enabled" in output.lower()
 
+    @device_state()
     def test_00_test_all_conditions(self):
         failed_tests = []
 
@@ -161,12 +188,23 @@ class TestBluetoothControl:
             ("test_15_restart_bluetooth_adapter", self.test_15_restart_bluetooth_adapter),
         ]
 
+        # Same scheduling as the collection: chain the declared states so the
+        # radio is only toggled where a test actually needs it
+        test_methods = state_scheduler.order(
+            [(entry, state_scheduler.declared_state(entry[1])) for entry in test_methods],
+            tracker.snapshot(),
+        )
+
         for name, method in test_methods:
+            requires, leaves = state_scheduler.declared_state(method)
             try:
                 log.info(f"[RUNNING] {name}")
+                tracker.ensure(requires)
                 method()
+                tracker.update(leaves)
                 log.info(f"[PASSED] {name}")
             except Exception as e:
+                tracker.invalidate(set(requires) | set(leaves))
                 log.error(f"[FAILED] {name} with error: {e}")
                 log.error(traceback.format_exc())
                 failed_tests.append(name)
@@ -0,0 +1,62 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import bt_metrics, logcat_parser  # noqa: E402
+
+# Enable reported by two tags (the first report must win), then a disable
+# going through the BLE states, as on Android 12+.
+NAMED_LOG = """\
+05-14 10:00:00.000  1000  1010 I ActivityManager: unrelated ON -> OFF
+05-14 10:00:00.100  1200  1210 D BluetoothAdapterService: OFF -> TURNING_ON
+05-14 10:00:00.150  1300  1310 D BluetoothAdapter: OFF -> BLE_TURNING_ON
+05-14 10:00:00.900  1200  1210 D BluetoothAdapterService: TURNING_ON -> ON
+05-14 10:00:00.950  1300  1310 D BluetoothAdapter: TURNING_ON -> ON
+05-14 10:00:05.000  1200  1210 D BluetoothManagerService: ON -> TURNING_OFF
+05-14 10:00:05.200  1200  1210 D BluetoothManagerService: TURNING_OFF -> BLE_ON
+05-14 10:00:05.300  1200  1210 D BluetoothManagerService: BLE_ON -> BLE_TURNING_OFF
+05-14 10:00:05.650  1200  1210 D BluetoothManagerService: BLE_TURNING_OFF -> OFF
+"""
+
+NUMERIC_LOG = """\
+05-14 10:00:00.000  1200  1210 D AdapterState: prevState=10, newState=11
+05-14 10:00:01.250  1200  1210 D AdapterState: prevState=11, newState=12
+"""
+
+
+def frame(text):
+    return logcat_parser.parse(text, 2024)
+
+
+def test_state_changes_only_reads_bluetooth_tags():
+    changes = bt_metrics.state_changes(frame(NAMED_LOG))
+    assert len(changes) == 8
+    assert changes[0][1:] == ("OFF", "TURNING_ON")
+
+
+def test_latencies_from_named_states():
+    assert bt_metrics.latencies(frame(NAMED_LOG)) == [("enable", 800), ("disable", 650)]
+
+
+def test_latencies_from_numeric_states():
+    assert bt_metrics.latencies(frame(NUMERIC_LOG)) == [("enable", 1250)]
+
+
+def test_unfinished_transition_is_not_reported():
+    text = "05-14 10:00:00.000  1200  1210 D BluetoothAdapter: OFF -> TURNING_ON\n"
+    assert bt_metrics.latencies(frame(text)) == []
+
+
+def test_record_and_summarize(tmp_path, monkeypatch):
+    monkeypatch.setattr(bt_metrics, "REPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(bt_metrics, "SAMPLES_FILE", str(tmp_path / "bt_latency.csv"))
+    monkeypatch.setattr(bt_metrics, "SUMMARY_FILE", str(tmp_path / "bt_latency_summary.json"))
+    device = {"model": "Pixel 7", "build": "UQ1A"}
+
+    bt_metrics.record("test_01", NAMED_LOG, device)
+    bt_metrics.record("test_02", NUMERIC_LOG, device)
+    summary = bt_metrics.summarize()
+
+    assert summary["Pixel 7"]["UQ1A"]["enable"]["count"] == 2
+    assert summary["Pixel 7"]["UQ1A"]["disable"]["max"] == 650
+    assert os.path.exists(tmp_path / "bt_latency_summary.json")
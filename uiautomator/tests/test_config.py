@@ -0,0 +1,96 @@
+import os
+import sys
+
+import pytest
+import yaml
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import calibrate, config  # noqa: E402
+
+CONFIG = {
+    "paths": {"reports_dir": "reports"},
+    "timing": {
+        "default": {"launch_settle": 2.0, "ui_settle": 1.0, "text_settle": 2.0, "boot_poll": 2.0},
+        "profiles": {"Pixel 7": {"launch_settle": 3.0, "ui_settle": 1.5}},
+    },
+}
+
+
+@pytest.fixture
+def configured(tmp_path, monkeypatch):
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(yaml.safe_dump(CONFIG), encoding="utf-8")
+    monkeypatch.setattr(config, "CONFIG_FILE", str(config_file))
+    monkeypatch.setattr(config, "PROFILES_FILE", str(tmp_path / "timing_profiles.yaml"))
+    monkeypatch.setattr(config, "device_model", lambda serial=None: {"S2": "Galaxy A10"}.get(serial, "Pixel 7"))
+    config.reload()
+    yield tmp_path
+    monkeypatch.undo()
+    config.reload()
+
+
+def test_get_and_get_path(configured):
+    assert config.get("timing.default.ui_settle") == 1.0
+    assert config.get("timing.default.missing", 7) == 7
+    assert config.get("paths.reports_dir.deeper", "x") == "x"
+    assert config.get_path("paths.reports_dir", "r") == os.path.join(config.BASE_DIR, "reports")
+    assert config.get_path("paths.absent", str(configured)) == str(configured)
+
+
+def test_timing_lookup_order(configured):
+    # Profile in config.yaml, then timing.default, then the caller's default
+    assert config.timing("launch_settle") == 3.0
+    assert config.timing("boot_poll") == 2.0
+    assert config.timing("launch_settle", "S2") == 2.0
+    assert config.timing("unknown_wait", default=4) == 4.0
+    with pytest.raises(KeyError):
+        config.timing("unknown_wait")
+
+    # A calibrated profile wins over the hand-written one, key by key
+    config.save_profiles({"Pixel 7": {"launch_settle": 5.0}})
+    assert config.timing("launch_settle") == 5.0
+    assert config.timing("ui_settle") == 1.5
+
+
+def test_save_profiles_leaves_config_yaml_alone(configured):
+    before = (configured / "config.yaml").read_text(encoding="utf-8")
+    config.save_profiles({"Pixel 7": {"ui_settle": 0.5}})
+    assert (configured / "config.yaml").read_text(encoding="utf-8") == before
+    assert config.load_profiles() == {"Pixel 7": {"ui_settle": 0.5}}
+
+
+def test_wait_settles_for_the_resolved_timing(configured, monkeypatch):
+    from utils import adb_backend
+
+    waited = []
+    monkeypatch.setattr(adb_backend, "settle", waited.append)
+    config.wait("ui_settle")
+    config.wait("ui_settle", "S2")
+    assert waited == [1.5, 1.0]
+
+
+def test_build_profile_scales_and_clamps(configured):
+    measured = {
+        "launch": {"p90": 1600.0},      # twice the reference
+        "ui_dump": {"p90": 60000.0},    # clamped to MAX_FACTOR
+        "input": {"p90": 50.0},         # clamped to MIN_FACTOR
+    }
+    profile = calibrate.build_profile(measured)
+    assert profile["launch_settle"] == 4.0
+    assert profile["ui_settle"] == 0.5
+    assert profile["text_settle"] == 1.0
+    # Only waits present in timing.default are scaled; polls are left alone
+    assert "send_wait" not in profile and "boot_poll" not in profile
+    assert profile["calibrated_ms"] == {"launch": 1600.0, "ui_dump": 60000.0, "input": 50.0}
+
+
+def test_build_profile_without_samples_keeps_defaults(configured):
+    profile = calibrate.build_profile({name: {"count": 0} for name in calibrate.REFERENCE_MS})
+    assert (profile["launch_settle"], profile["ui_settle"]) == (2.0, 1.0)
+
+
+def test_save_profile_merges_models(configured):
+    calibrate.save_profile("Pixel 7", {"ui_settle": 0.8})
+    calibrate.save_profile("Galaxy A10", {"ui_settle": 2.0})
+    assert config.timing("ui_settle") == 0.8
+    assert config.timing("ui_settle", "S2") == 2.0
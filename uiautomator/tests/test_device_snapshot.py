@@ -0,0 +1,103 @@
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import device_snapshot  # noqa: E402
+
+MARK = device_snapshot.SECTION_MARK
+
+
+def dump(global_=(), secure=(), system=()):
+    sections = {"global": global_, "secure": secure, "system": system}
+    lines = []
+    for namespace, rows in sections.items():
+        lines.append(f"{MARK}{namespace}")
+        lines.extend(rows)
+    return "\n".join(lines) + "\n"
+
+
+BEFORE = dump(
+    global_=["airplane_mode_on=0", "wifi_on=1", "boot_count=4", "adb_enabled=1", "device_name=Pixel 7"],
+    secure=["sleep_timeout=-1", "location_mode=3"],
+    system=["screen_brightness=120", "font_scale=1.0", "ringtone=content://media/ring?title=A b"],
+)
+AFTER = dump(
+    global_=["airplane_mode_on=1", "wifi_on=0", "boot_count=5", "adb_enabled=1", "device_name=Pixel 7"],
+    secure=["sleep_timeout=30000", "location_mode=0", "test_added=1"],
+    system=["screen_brightness=80", "font_scale=1.3", "ringtone=content://media/ring?title=A b"],
+)
+
+
+class FakeShell:
+    def __init__(self, *outputs):
+        self.outputs = list(outputs)
+        self.commands = []
+
+    def __call__(self, cmd, timeout=None):
+        self.commands.append(cmd[-1])
+        out = self.outputs.pop(0) if self.outputs else ""
+        return subprocess.CompletedProcess(cmd, 0, out, "")
+
+
+def test_capture_parses_sections_in_one_call(monkeypatch):
+    shell = FakeShell("stray line before any section\n" + BEFORE)
+    monkeypatch.setattr(device_snapshot.adb_backend, "run", shell)
+    snapshot = device_snapshot.capture()
+    assert len(shell.commands) == 1
+    assert snapshot[("global", "device_name")] == "Pixel 7"
+    assert snapshot[("system", "ringtone")] == "content://media/ring?title=A b"
+    assert ("global", "stray line before any section") not in snapshot
+    assert len(snapshot) == 10
+
+
+def parse(text, monkeypatch):
+    monkeypatch.setattr(device_snapshot.adb_backend, "run", FakeShell(text))
+    return device_snapshot.capture()
+
+
+def test_diff_skips_volatile_keys_and_keeps_original_values(monkeypatch):
+    changed = device_snapshot.diff(parse(BEFORE, monkeypatch), parse(AFTER, monkeypatch))
+    assert changed == {
+        ("global", "airplane_mode_on"): "0",
+        ("global", "wifi_on"): "1",
+        ("secure", "location_mode"): "3",
+        ("secure", "test_added"): None,
+        ("system", "font_scale"): "1.0",
+    }
+
+
+def test_restore_commands_put_delete_then_radios(monkeypatch):
+    changed = device_snapshot.diff(parse(BEFORE, monkeypatch), parse(AFTER, monkeypatch))
+    assert device_snapshot.restore_commands(changed) == [
+        "settings put secure location_mode 3",
+        "settings delete secure test_added",
+        "settings put system font_scale 1.0",
+        # Airplane mode goes back before wifi is re-enabled
+        "settings put global airplane_mode_on 0",
+        "am broadcast -a android.intent.action.AIRPLANE_MODE --ez state false",
+        "svc wifi enable",
+    ]
+
+
+def test_restore_quotes_values_and_skips_radios_that_did_not_exist():
+    commands = device_snapshot.restore_commands({
+        ("system", "ringtone"): "content://media/ring?title=A b",
+        ("global", "bluetooth_on"): None,
+    })
+    assert commands == ["settings put system ringtone 'content://media/ring?title=A b'"]
+
+
+def test_restore_runs_one_shell_call_only_when_something_changed(monkeypatch):
+    before = parse(BEFORE, monkeypatch)
+    # capture, restore, then a capture that finds everything back in place
+    shell = FakeShell(AFTER, "", BEFORE)
+    monkeypatch.setattr(device_snapshot.adb_backend, "run", shell)
+
+    changed = device_snapshot.restore(before)
+    assert len(changed) == 5
+    assert len(shell.commands) == 2
+    assert shell.commands[1].startswith("settings put secure location_mode 3; ")
+
+    assert device_snapshot.restore(before) == {}
+    assert len(shell.commands) == 3
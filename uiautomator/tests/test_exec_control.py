@@ -0,0 +1,188 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import exec_control  # noqa: E402
+
+OFFLINE = "error: device offline"
+
+
+class FakeProcess:
+    """Stands in for run_process, answering each call from a script of results."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.timeouts = []
+
+    def __call__(self, cmd, timeout):
+        self.timeouts.append(timeout)
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, Exception):
+            raise result
+        returncode, stderr = result
+        return subprocess.CompletedProcess(cmd, returncode, "out" if returncode == 0 else "", stderr)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr(exec_control.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(exec_control.time, "sleep", sleep)
+    monkeypatch.setattr(exec_control, "_breakers", {})
+    clock = type("Clock", (), {})()
+    clock.now, clock.sleeps = now, sleeps
+    return clock
+
+
+def fake(monkeypatch, *results):
+    process = FakeProcess(*results)
+    monkeypatch.setattr(exec_control, "run_process", process)
+    return process
+
+
+def cmd(serial="S1"):
+    return ["adb", "-s", serial, "shell", "true"]
+
+
+def test_breaker_opens_fails_fast_and_closes_after_a_good_probe(clock):
+    breaker = exec_control.CircuitBreaker(threshold=2, cooldown=30)
+    breaker.record_failure("S1", "offline")
+    breaker.before_call("S1")
+    breaker.record_failure("S1", "offline")
+    with pytest.raises(exec_control.DeviceUnavailableError):
+        breaker.before_call("S1")
+
+    # After the cool-down one probe goes through; a single failure re-opens
+    clock.now[0] += 30
+    breaker.before_call("S1")
+    breaker.record_failure("S1", "offline")
+    with pytest.raises(exec_control.DeviceUnavailableError):
+        breaker.before_call("S1")
+
+    clock.now[0] += 30
+    breaker.before_call("S1")
+    breaker.record_success()
+    assert (breaker.failures, breaker.opened_at) == (0, None)
+
+
+def test_retries_are_bounded_and_jitter_stays_under_the_cap(clock, monkeypatch):
+    process = fake(monkeypatch, (1, OFFLINE))
+    bounds = []
+    monkeypatch.setattr(exec_control.random, "uniform", lambda low, high: bounds.append((low, high)) or high)
+
+    result = exec_control.execute(cmd(), retries=5)
+    assert result.returncode == 1
+    assert len(process.timeouts) == 6
+    assert bounds == [(0, 1.0), (0, 2.0), (0, 4.0), (0, 5.0), (0, 5.0)]
+    assert clock.sleeps == [1.0, 2.0, 4.0, 5.0, 5.0]
+
+
+def test_one_exhausted_command_is_one_breaker_failure(clock, monkeypatch):
+    fake(monkeypatch, (1, OFFLINE), (1, OFFLINE), (1, OFFLINE), (0, ""))
+    monkeypatch.setattr(exec_control.random, "uniform", lambda low, high: 0)
+
+    exec_control.execute(cmd())
+    assert exec_control.breaker_for("S1").failures == 1
+    assert exec_control.breaker_for("S1").opened_at is None
+
+    # A command that recovers on retry resets the count
+    assert exec_control.execute(cmd()).returncode == 0
+    assert exec_control.breaker_for("S1").failures == 0
+
+
+def test_breaker_opens_after_threshold_commands_and_is_per_device(clock, monkeypatch):
+    fake(monkeypatch, (1, OFFLINE))
+    monkeypatch.setattr(exec_control.random, "uniform", lambda low, high: 0)
+    for _ in range(exec_control.BREAKER_THRESHOLD):
+        exec_control.execute(cmd())
+    with pytest.raises(exec_control.DeviceUnavailableError):
+        exec_control.execute(cmd())
+
+    fake(monkeypatch, (0, ""))
+    assert exec_control.execute(cmd("S2")).returncode == 0
+
+
+def test_unauthorized_is_not_retried(clock, monkeypatch):
+    process = fake(monkeypatch, (1, "error: device unauthorized"))
+    with pytest.raises(exec_control.DeviceUnavailableError):
+        exec_control.execute(cmd())
+    assert len(process.timeouts) == 1
+
+
+def test_expected_outage_neither_retries_nor_trips_the_breaker(clock, monkeypatch):
+    process = fake(monkeypatch, (1, OFFLINE))
+    with exec_control.expected_outage():
+        for _ in range(exec_control.BREAKER_THRESHOLD + 1):
+            assert exec_control.execute(cmd()).returncode == 1
+    assert len(process.timeouts) == exec_control.BREAKER_THRESHOLD + 1
+    assert exec_control.breaker_for("S1").opened_at is None
+
+
+def test_deadline_caps_command_timeout_and_nests_tighter(clock, monkeypatch):
+    process = fake(monkeypatch, (0, ""))
+    with exec_control.deadline(10):
+        exec_control.execute(cmd(), timeout=60)
+        with exec_control.deadline(100):
+            assert exec_control.remaining() == 10
+        with exec_control.deadline(4):
+            exec_control.execute(cmd(), timeout=60)
+    assert exec_control.remaining() is None
+    exec_control.execute(cmd(), timeout=60)
+    assert process.timeouts == [10, 4, 60]
+
+
+def test_expired_deadline_raises_before_running(clock, monkeypatch):
+    process = fake(monkeypatch, (0, ""))
+    with exec_control.deadline(5):
+        clock.now[0] += 5
+        with pytest.raises(exec_control.DeadlineExceeded):
+            exec_control.execute(cmd())
+    assert process.timeouts == []
+
+
+def test_retry_is_skipped_when_backoff_would_outlive_the_deadline(clock, monkeypatch):
+    process = fake(monkeypatch, (1, OFFLINE))
+    monkeypatch.setattr(exec_control.random, "uniform", lambda low, high: high)
+    with exec_control.deadline(0.5):
+        assert exec_control.execute(cmd()).returncode == 1
+    assert len(process.timeouts) == 1
+    assert exec_control.breaker_for("S1").failures == 1
+
+
+def test_hung_command_counts_against_the_breaker(clock, monkeypatch):
+    fake(monkeypatch, exec_control.DeadlineExceeded("killed"))
+    with pytest.raises(exec_control.DeadlineExceeded):
+        exec_control.execute(cmd())
+    assert exec_control.breaker_for("S1").failures == 1
+
+
+class FakeItem:
+    def __init__(self, marker_seconds=None, option=None):
+        self.marker = pytest.mark.deadline(marker_seconds).mark if marker_seconds else None
+        self.config = type("Config", (), {"getoption": lambda self, name: option})()
+
+    def get_closest_marker(self, name):
+        return self.marker
+
+
+def test_deadline_covers_only_the_test_call():
+    hook = exec_control.pytest_runtest_call(FakeItem(marker_seconds=30, option=5))
+    next(hook)
+    assert 29 < exec_control.remaining() <= 30
+    with pytest.raises(StopIteration):
+        next(hook)
+    # Teardown of fixtures runs after the hook has finished, with no deadline
+    assert exec_control.remaining() is None
+
+    hook = exec_control.pytest_runtest_call(FakeItem(option=None))
+    next(hook)
+    assert exec_control.remaining() is None
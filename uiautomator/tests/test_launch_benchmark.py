@@ -0,0 +1,75 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import launch_benchmark, stats  # noqa: E402
+
+AM_START_W = """\
+Starting: Intent { cmp=com.android.vending/.AssetBrowserActivity }
+Status: ok
+LaunchState: COLD
+Activity: com.android.vending/.AssetBrowserActivity
+TotalTime: 812
+WaitTime: 830
+Complete
+"""
+
+
+def result(mode="cold", cache_dropped=True, p50=800.0):
+    return {
+        "package": "com.android.vending", "mode": mode, "model": "Pixel 7", "build": "UQ1A",
+        "cache_dropped": cache_dropped, "total_time": {"count": 10, "p50": p50},
+    }
+
+
+def test_time_regex_reads_am_start_output(monkeypatch):
+    monkeypatch.setattr(launch_benchmark.adb_utils, "run_adb_command", lambda cmd: AM_START_W)
+    assert launch_benchmark.launch_once("com.android.vending/.AssetBrowserActivity") == \
+        {"TotalTime": 812, "WaitTime": 830}
+
+
+def test_launch_without_timing_is_an_error(monkeypatch):
+    monkeypatch.setattr(launch_benchmark.adb_utils, "run_adb_command",
+                        lambda cmd: "Error: Activity class {x/.Y} does not exist.")
+    with pytest.raises(RuntimeError):
+        launch_benchmark.launch_once("x/.Y")
+
+
+def test_reject_outliers_uses_tukey_fences():
+    kept, rejected = launch_benchmark.reject_outliers([800, 810, 790, 805, 795, 2400, 300])
+    assert rejected == [2400, 300]
+    assert sorted(kept) == [790, 795, 800, 805, 810]
+    # Too few samples to judge the spread
+    assert launch_benchmark.reject_outliers([100, 5000, 90]) == ([100, 5000, 90], [])
+    assert stats.summarize(kept)["p50"] == 800
+
+
+def test_baseline_key_separates_cold_runs_without_a_cache_drop():
+    assert launch_benchmark._baseline_key(result()) == "Pixel 7|UQ1A|com.android.vending|cold"
+    assert launch_benchmark._baseline_key(result(cache_dropped=False)) == \
+        "Pixel 7|UQ1A|com.android.vending|cold-no-drop"
+    assert launch_benchmark._baseline_key(result("warm", cache_dropped=False)).endswith("|warm")
+
+
+def test_compare_against_saved_baseline(tmp_path, monkeypatch):
+    monkeypatch.setattr(launch_benchmark, "BASELINE_FILE", str(tmp_path / "baselines.json"))
+    assert launch_benchmark.compare(result()) is None
+
+    launch_benchmark.save_baseline(result(p50=800.0))
+    assert launch_benchmark.compare(result(p50=880.0)) == \
+        {"baseline_p50": 800.0, "current_p50": 880.0, "delta": 0.1, "regressed": False}
+    assert launch_benchmark.compare(result(p50=960.0))["regressed"]
+    assert launch_benchmark.compare(result(p50=960.0), tolerance=0.25)["regressed"] is False
+
+    # A run without a cache drop has no baseline of its own yet
+    assert launch_benchmark.compare(result(cache_dropped=False, p50=500.0)) is None
+
+
+def test_compare_ignores_runs_with_no_samples(tmp_path, monkeypatch):
+    monkeypatch.setattr(launch_benchmark, "BASELINE_FILE", str(tmp_path / "baselines.json"))
+    launch_benchmark.save_baseline(result())
+    empty = result()
+    empty["total_time"] = {"count": 0}
+    assert launch_benchmark.compare(empty) is None
@@ -0,0 +1,64 @@
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import log_archive, logcat_parser  # noqa: E402
+
+RUN_TIME = datetime(2024, 5, 14, 10, 0, 0)
+
+
+def logcat_text(lines=1200):
+    # Enough lines to span several compressed blocks
+    out = ["--------- beginning of main"]
+    for i in range(lines):
+        tag, level, pid = ("BluetoothAdapter", "D", 1234) if i % 2 else ("ActivityManager", "I", 999)
+        if i == 1001:
+            tag, level = "BluetoothAdapter", "E"
+        out.append(f"05-14 10:00:{i // 100:02d}.{i % 100:03d}  {pid}  {pid + 1} {level} {tag}: message {i}")
+    return "\n".join(out)
+
+
+def test_parse_line_reads_threadtime_fields():
+    parsed = logcat_parser.parse_line("05-14 10:00:01.250  1234  1240 E BluetoothAdapter: disable() failed", 2024)
+    time_ms, pid, tid, level, tag, message = parsed
+    assert (pid, tid, level, tag, message) == (1234, 1240, "E", "BluetoothAdapter", "disable() failed")
+    assert time_ms == int(datetime(2024, 5, 14, 10, 0, 1, 250000).timestamp() * 1000)
+    assert logcat_parser.parse_line("--------- beginning of main", 2024) is None
+
+
+def test_archive_and_search_round_trip(tmp_path):
+    root = str(tmp_path)
+    path = log_archive.archive_logcat("test_01 bluetooth", logcat_text(), root=root, run_time=RUN_TIME)
+    assert os.path.exists(path)
+    assert [e["test"] for e in log_archive.runs(root)] == ["test_01 bluetooth"]
+
+    hits = [line for _, line in log_archive.search(tag="BluetoothAdapter", level="E", root=root)]
+    assert hits == ["05-14 10:00:10.001  1234  1235 E BluetoothAdapter: message 1001"]
+
+    by_pid = list(log_archive.search(pid=999, root=root))
+    assert len(by_pid) == 600
+    assert all(" I ActivityManager: " in line for _, line in by_pid)
+
+    contains = [line for _, line in log_archive.search(tag="BluetoothAdapter", contains="message 1199", root=root)]
+    assert contains == ["05-14 10:00:11.099  1234  1235 D BluetoothAdapter: message 1199"]
+
+
+def test_search_by_time_window_and_unknown_tag(tmp_path):
+    root = str(tmp_path)
+    log_archive.archive_logcat("test_02", logcat_text(), root=root, run_time=RUN_TIME)
+
+    since = datetime(2024, 5, 14, 10, 0, 5)
+    until = datetime(2024, 5, 14, 10, 0, 5, 9000)
+    window = [line for _, line in log_archive.search(since=since, until=until, root=root)]
+    assert [line.rsplit(" ", 1)[1] for line in window] == [str(i) for i in range(500, 510)]
+
+    assert list(log_archive.search(tag="NoSuchTag", root=root)) == []
+
+
+def test_runs_filters_by_test_and_last(tmp_path):
+    root = str(tmp_path)
+    for i, name in enumerate(["a", "b", "a"]):
+        log_archive.archive_logcat(name, logcat_text(10), root=root, run_time=RUN_TIME.replace(second=i))
+    assert len(log_archive.runs(root, test="a")) == 2
+    assert [e["test"] for e in log_archive.runs(root, last=1)] == ["a"]
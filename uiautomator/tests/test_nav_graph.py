@@ -0,0 +1,143 @@
+import os
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import nav_graph  # noqa: E402
+
+PACKAGE = "com.android.vending"
+MAIN = f"{PACKAGE}/.MainActivity"
+
+
+def hierarchy(*ids, extra=""):
+    nodes = "".join(f'<node class="android.widget.FrameLayout" resource-id="{PACKAGE}:id/{i}" />' for i in ids)
+    return ET.fromstring(f"<hierarchy>{nodes}{extra}</hierarchy>")
+
+
+HOME = nav_graph.fingerprint(MAIN, hierarchy("toolbar", "bottom_nav"))
+SEARCH = nav_graph.fingerprint(MAIN, hierarchy("search_bar"))
+DETAILS = nav_graph.fingerprint(f"{PACKAGE}/.DetailsActivity", hierarchy("toolbar"))
+
+
+def test_fingerprint_ignores_content_and_order():
+    cards = '<node class="android.widget.TextView" resource-id="com.android.vending:id/card_title" text="Ad" />'
+    assert nav_graph.fingerprint(MAIN, hierarchy("bottom_nav", "toolbar", extra=cards)) == HOME
+    assert HOME != SEARCH
+    assert nav_graph.activity_of(HOME) == MAIN
+
+
+def test_parse_resumed_activity_formats():
+    assert nav_graph.parse_resumed_activity(
+        "  mResumedActivity: ActivityRecord{a1b2 u0 com.android.vending/.MainActivity t12}") == MAIN
+    assert nav_graph.parse_resumed_activity(
+        "  topResumedActivity=ActivityRecord{a1b2 u0 com.android.vending/.MainActivity t12}") == MAIN
+    assert nav_graph.parse_resumed_activity("") is None
+
+
+@pytest.fixture
+def graph(tmp_path, monkeypatch):
+    monkeypatch.setattr(nav_graph, "GRAPH_DIR", str(tmp_path))
+    graph = nav_graph.NavGraph(PACKAGE, 1)
+    graph.record("launcher", nav_graph.launch(MAIN), HOME, 800)
+    graph.record(HOME, nav_graph.tap(10, 10), SEARCH, 100)
+    graph.record(SEARCH, nav_graph.tap(20, 20), DETAILS, 100)
+    graph.record(HOME, nav_graph.deep_link("market://details?id=x", PACKAGE), DETAILS, 500)
+    return graph
+
+
+def test_record_stores_launches_as_global_edges_and_smooths_costs(graph):
+    assert "launcher" not in graph.edges
+    key = nav_graph.action_key(nav_graph.tap(10, 10))
+    graph.record(HOME, nav_graph.tap(10, 10), SEARCH, 200)
+    assert graph.edges[HOME][key]["cost"] == 130
+    # A changed destination replaces the edge and its cost
+    graph.record(HOME, nav_graph.tap(10, 10), DETAILS, 50)
+    assert graph.edges[HOME][key] == {"action": nav_graph.tap(10, 10), "to": DETAILS, "cost": 50}
+
+
+def test_shortest_path_uses_global_edges_and_costs(graph):
+    steps = graph.shortest_path("launcher", SEARCH)
+    assert [(action["type"], to) for _, action, to in steps] == [("launch", HOME), ("tap", SEARCH)]
+    # Two taps (200ms) beat the deep link (500ms)
+    assert [action["type"] for _, action, _ in graph.shortest_path(HOME, DETAILS)] == ["tap", "tap"]
+    assert graph.shortest_path(HOME, HOME) == []
+    assert graph.shortest_path(HOME, "nowhere") is None
+
+
+def test_penalise_makes_the_planner_prefer_another_path(graph):
+    steps = graph.shortest_path(HOME, DETAILS)
+    graph.penalise([(source, action) for source, action, _ in steps])
+    graph.penalise([(source, action) for source, action, _ in steps])
+    assert [action["type"] for _, action, _ in graph.shortest_path(HOME, DETAILS)] == ["deeplink"]
+
+
+def test_graph_round_trips_and_knows_shared_activities(graph):
+    graph.names["home"] = HOME
+    graph.save()
+    loaded = nav_graph.NavGraph.load(PACKAGE, 1)
+    assert loaded.names == {"home": HOME}
+    assert loaded.edges == graph.edges
+    assert loaded.shares_activity(HOME)
+    assert not loaded.shares_activity(DETAILS)
+
+
+class FakeDevice:
+    """Resumed activity and UI hierarchy of a single-activity app."""
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.moves = {}
+        self.dumps = 0
+
+    def run(self, cmd, timeout=None):
+        command = " ".join(cmd)
+        if "ResumedActivity" in command:
+            out = f"  mResumedActivity: ActivityRecord{{1 u0 {nav_graph.activity_of(self.screen)} t1}}\n"
+            return subprocess.CompletedProcess(cmd, 0, out, "")
+        self.screen = self.moves.get(command, self.screen)
+        return subprocess.CompletedProcess(cmd, 0, "", "")
+
+    def dump(self, serial, path):
+        self.dumps += 1
+        ids = {HOME: ("toolbar", "bottom_nav"), SEARCH: ("search_bar",)}[self.screen]
+        return hierarchy(*ids)
+
+
+@pytest.fixture
+def navigator(graph, monkeypatch):
+    device = FakeDevice(SEARCH)
+    device.moves["adb " + " ".join(nav_graph.action_command(nav_graph.launch(MAIN)))] = SEARCH
+    monkeypatch.setattr(nav_graph.adb_backend, "run", device.run)
+    monkeypatch.setattr(nav_graph.ui_dump, "dump", device.dump)
+    monkeypatch.setattr(nav_graph.config, "wait", lambda key, serial=None: None)
+    monkeypatch.setattr(nav_graph.package_inventory, "get_inventory",
+                        lambda serial=None: type("Inventory", (), {"version_code": lambda self, p: 1})())
+    graph.names["home"] = HOME
+    graph.save()
+    nav = nav_graph.Navigator(PACKAGE)
+    nav.device = device
+    return nav
+
+
+def test_wrong_screen_in_a_shared_activity_is_not_cached(navigator):
+    # am start resumes the existing task on the search screen, not home
+    navigator.screen = DETAILS
+    navigator.device.screen = "launcher"
+    with pytest.raises(nav_graph.NavigationError):
+        navigator.navigate_to("home")
+    assert navigator.screen is None
+    assert navigator.graph.edges[nav_graph.ANY][nav_graph.action_key(nav_graph.launch(MAIN))]["cost"] > 800
+
+
+def test_confirmed_arrival_is_cached(navigator):
+    navigator.device.screen = SEARCH
+    navigator.device.moves["adb shell input keyevent 4"] = HOME
+    navigator.graph.record(SEARCH, nav_graph.keyevent(4), HOME, 50)
+    assert navigator.navigate_to("home") == 1
+    assert navigator.screen == HOME
+    dumps = navigator.device.dumps
+    assert navigator.navigate_to("home") == 0
+    assert navigator.device.dumps == dumps
@@ -0,0 +1,134 @@
+import os
+import socket
+import sys
+import threading
+import time
+from email import message_from_bytes
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import notifier  # noqa: E402
+
+
+class SmtpStandIn:
+    """Just enough of an SMTP server to count connections and keep messages."""
+
+    def __init__(self, reject=()):
+        self.reject = set(reject)
+        self.connections = 0
+        self.rcpt_attempts = 0
+        self.messages = []
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._session, args=(conn,), daemon=True).start()
+
+    def _session(self, conn):
+        f = conn.makefile("rwb")
+        f.write(b"220 stand-in\r\n")
+        f.flush()
+        data, lines = False, []
+        for line in f:
+            if data:
+                if line == b".\r\n":
+                    data = False
+                    self.messages.append(message_from_bytes(b"".join(lines)))
+                    lines = []
+                    f.write(b"250 queued\r\n")
+                else:
+                    lines.append(line)
+            else:
+                command = line.decode().strip()
+                verb = command[:4].upper()
+                if verb == "RCPT":
+                    self.rcpt_attempts += 1
+                    refused = any(address in command for address in self.reject)
+                    f.write(b"550 no such user\r\n" if refused else b"250 ok\r\n")
+                elif verb == "DATA":
+                    data = True
+                    f.write(b"354 go ahead\r\n")
+                elif verb == "QUIT":
+                    f.write(b"221 bye\r\n")
+                    f.flush()
+                    break
+                else:
+                    f.write(b"250 ok\r\n")
+            f.flush()
+        conn.close()
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def smtp_server():
+    server = SmtpStandIn(reject={"nobody@example.com"})
+    yield server
+    server.close()
+
+
+def job(test, module="Message"):
+    return {"module": module, "class": None, "test": test, "method": "ADB"}
+
+
+def test_notices_are_coalesced_into_digests_over_one_connection(smtp_server):
+    dispatcher = notifier.Notifier("127.0.0.1", smtp_server.port, digest_window=0.3)
+    for i in range(5):
+        dispatcher.pre("qa@example.com", job(f"test_{i}"))
+        dispatcher.post("qa@example.com", job(f"test_{i}"), passed=i != 2, result=f"result {i}")
+    dispatcher.post("lead@example.com", job("test_url"), passed=True, result="all good")
+    dispatcher.stop()
+
+    subjects = sorted(m["Subject"] for m in smtp_server.messages)
+    assert subjects == [
+        "[UIAutomator] 5 jobs finished, 1 failed",
+        "[UIAutomator] 5 jobs started",
+        "[UIAutomator] PASSED: Message.test_url",
+    ]
+    digest = next(m for m in smtp_server.messages if "finished" in m["Subject"])
+    assert "FAIL  Message.test_2" in digest.get_payload()
+    assert "result 2" in digest.get_payload()
+    assert smtp_server.connections == 1
+    assert dispatcher.sent == 3
+
+
+def test_refused_recipient_is_not_retried(smtp_server):
+    dispatcher = notifier.Notifier("127.0.0.1", smtp_server.port, digest_window=0.05)
+    dispatcher.post("nobody@example.com", job("test_0"), passed=True, result="ok")
+    dispatcher.post("qa@example.com", job("test_1"), passed=True, result="ok")
+    dispatcher.stop()
+
+    assert smtp_server.rcpt_attempts == 2
+    assert [m["To"] for m in smtp_server.messages] == ["qa@example.com"]
+    assert smtp_server.connections == 1
+
+
+def test_enqueue_never_waits_for_the_server():
+    unused = socket.socket()
+    unused.bind(("127.0.0.1", 0))
+    port = unused.getsockname()[1]
+    unused.close()
+
+    dispatcher = notifier.Notifier("127.0.0.1", port, digest_window=0.05)
+    started = time.monotonic()
+    for i in range(200):
+        assert dispatcher.post("qa@example.com", job(f"test_{i}"), passed=True, result="ok")
+    assert time.monotonic() - started < 0.5
+    dispatcher.stop()
+    assert dispatcher.sent == 0
+
+
+def test_disabled_without_host_or_recipient():
+    assert not notifier.Notifier(None).pre("qa@example.com", job("test_0"))
+    assert not notifier.Notifier("127.0.0.1").pre("", job("test_0"))
@@ -0,0 +1,133 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import package_inventory  # noqa: E402
+
+PM_LIST = """\
+package:/data/app/~~Xy1==/com.android.vending-Ab2==/base.apk=com.android.vending versionCode:84021300 uid:10123
+package:/system/app/Bluetooth/Bluetooth.apk=com.android.bluetooth versionCode:34 uid:1002
+package:/data/app/com.example.app-1/base.apk=com.example.app
+not a package line
+"""
+
+DUMPSYS = """\
+  Package [com.android.vending] (a1b2c3):
+    lastUpdateTime=2024-05-01 09:00:00
+    lastUpdateTime=2024-01-01 00:00:00
+  Package [com.android.bluetooth] (d4e5f6):
+    lastUpdateTime=2008-12-31 16:00:00
+"""
+
+
+def test_parse_package_list():
+    packages = package_inventory.parse_package_list(PM_LIST)
+    assert sorted(packages) == ["com.android.bluetooth", "com.android.vending", "com.example.app"]
+    vending = packages["com.android.vending"]
+    assert vending == {
+        "path": "/data/app/~~Xy1==/com.android.vending-Ab2==/base.apk",
+        "version_code": 84021300,
+        "uid": 10123,
+    }
+    assert packages["com.example.app"]["version_code"] is None
+
+
+def test_parse_update_times_keeps_first_stamp_per_package():
+    assert package_inventory.parse_update_times(DUMPSYS) == {
+        "com.android.vending": "2024-05-01 09:00:00",
+        "com.android.bluetooth": "2008-12-31 16:00:00",
+    }
+
+
+class FakeDevice:
+    def __init__(self, serialno, count):
+        self.serialno = serialno
+        self.versions = {f"com.p{i}": 1 for i in range(count)}
+        self.calls = []
+
+    def __call__(self, cmd_list):
+        self.calls.append(cmd_list)
+        if "ro.serialno" in cmd_list:
+            return self.serialno
+        out = ""
+        for command in cmd_list[-1].split("; "):
+            if command.startswith("dumpsys"):
+                out += "".join(f"  Package [{name}] (x):\n    lastUpdateTime=v{version}\n"
+                               for name, version in self.versions.items())
+                continue
+            name = command.split()[-1]
+            names = [name] if name in self.versions else self.versions
+            out += "".join(f"package:/data/app/{name}/base.apk={name} versionCode:{self.versions[name]}\n"
+                           for name in names)
+        return out
+
+    def pm_calls(self):
+        return sum(1 for cmd in self.calls if "pm list" in cmd[-1])
+
+    def dumpsys_calls(self):
+        return sum(1 for cmd in self.calls if "dumpsys" in cmd[-1])
+
+
+@pytest.fixture
+def device(tmp_path, monkeypatch):
+    monkeypatch.setattr(package_inventory, "CACHE_DIR", str(tmp_path))
+    fake = FakeDevice("SERIAL1", 50)
+    monkeypatch.setattr(package_inventory.adb_utils, "run_adb_command", fake)
+    return fake
+
+
+def test_first_listing_takes_one_shell_call(device):
+    inventory = package_inventory.PackageInventory(ttl=0)
+    assert inventory.refresh() == {"full": 50}
+    assert (device.pm_calls(), device.dumpsys_calls()) == (1, 1)
+    assert len([cmd for cmd in device.calls if "ro.serialno" not in cmd]) == 1
+    assert inventory.update_times["com.p0"] == "v1"
+
+
+def test_incremental_refresh_queries_only_changed_packages(device):
+    inventory = package_inventory.PackageInventory(ttl=0)
+    assert inventory.refresh() == {"full": 50}
+
+    device.versions["com.p7"] = 2
+    del device.versions["com.p9"]
+    device.calls.clear()
+    assert inventory.refresh() == {"removed": ["com.p9"], "changed": ["com.p7"]}
+    assert device.pm_calls() == 1
+    assert inventory.version_code("com.p7") == 2
+    assert not inventory.is_installed("com.p9")
+
+
+def test_many_changes_fall_back_to_one_full_listing(device):
+    inventory = package_inventory.PackageInventory(ttl=0)
+    inventory.refresh()
+    for name in list(device.versions)[:package_inventory.FULL_RELOAD_THRESHOLD + 1]:
+        device.versions[name] = 2
+    device.calls.clear()
+    assert inventory.refresh() == {"full": 50}
+    assert device.pm_calls() == 1
+
+
+def test_new_process_diffs_against_the_cache_on_disk(device):
+    package_inventory.PackageInventory(ttl=0).refresh()
+    device.versions["com.p3"] = 5
+    device.calls.clear()
+
+    inventory = package_inventory.PackageInventory(ttl=0)
+    assert inventory.refresh() == {"removed": [], "changed": ["com.p3"]}
+    assert device.pm_calls() == 1
+    assert inventory.version_code("com.p3") == 5
+    assert len(inventory) == 50
+
+
+def test_cache_is_keyed_by_hardware_serial(device, tmp_path):
+    package_inventory.PackageInventory(ttl=0).refresh()
+    assert os.path.exists(tmp_path / "SERIAL1.json")
+
+    # Another phone behind the same adb serial starts from a full listing
+    device.serialno = "SERIAL2"
+    device.versions = {"com.other": 1}
+    inventory = package_inventory.PackageInventory(ttl=0)
+    assert inventory.refresh() == {"full": 1}
+    assert inventory.names() == ["com.other"]
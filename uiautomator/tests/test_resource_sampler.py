@@ -0,0 +1,112 @@
+import math
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import resource_sampler  # noqa: E402
+
+PROBE_OUTPUT = """\
+cpu  1000 0 500 8000 500 0 0 0 0 0
+MemTotal:        7812345 kB
+MemAvailable:    3123456 kB
+  level: 87
+  temperature: 312
+thermal: 41250
+thermal: 38
+thermal: -40000
+thermal: not-a-number
+"""
+
+
+def test_parse_probe_reads_every_source():
+    sample, cpu = resource_sampler.parse_probe(PROBE_OUTPUT.splitlines())
+    assert cpu == [1000, 0, 500, 8000, 500, 0, 0, 0, 0, 0]
+    assert sample["mem_total_kb"] == 7812345
+    assert sample["mem_available_kb"] == 3123456
+    assert sample["battery_level"] == 87
+    assert sample["battery_temp_c"] == pytest.approx(31.2)
+    # Millidegree and plain-degree zones are both understood
+    assert sample["thermal_max_c"] == pytest.approx(41.25)
+    # No previous reading, no CPU percentage yet
+    assert "cpu_pct" not in sample
+
+
+def test_parse_probe_cpu_from_the_previous_tick():
+    previous = [1000, 0, 500, 8000, 500, 0, 0, 0, 0, 0]
+    lines = ["cpu  1300 0 600 8500 600 0 0 0 0 0"]
+    sample, _ = resource_sampler.parse_probe(lines, previous)
+    # 1000 jiffies passed, 600 of them idle or iowait
+    assert sample["cpu_pct"] == pytest.approx(40.0)
+    sample, _ = resource_sampler.parse_probe(lines, [1300, 0, 600, 8500, 600, 0, 0, 0, 0, 0])
+    assert "cpu_pct" not in sample
+
+
+def test_ring_wraps_and_keeps_order():
+    ring = resource_sampler.SampleRing(capacity=3)
+    assert ring.series() == []
+    for i in range(5):
+        ring.append({"time": float(i), "cpu_pct": i * 10.0})
+    assert len(ring) == 3
+    series = ring.series()
+    assert [row["time"] for row in series] == [2.0, 3.0, 4.0]
+    assert series[0]["cpu_pct"] == 20.0
+    assert series[0]["battery_level"] is None
+
+
+def test_ring_is_preallocated():
+    ring = resource_sampler.SampleRing(capacity=4)
+    assert all(len(column) == 4 and math.isnan(column[0]) for column in ring.columns.values())
+
+
+def test_summary_skips_missing_columns():
+    sampler = resource_sampler.ResourceSampler(capacity=4)
+    sampler.ring.append({"time": 1.0, "cpu_pct": 10.0})
+    sampler.ring.append({"time": 2.0, "cpu_pct": 30.0})
+    assert sampler.summary() == {"samples": 2, "cpu_pct": {"min": 10.0, "max": 30.0, "mean": 20.0}}
+
+
+def local_shell(monkeypatch, program):
+    # Runs a local Python process in place of `adb shell`
+    real_popen = subprocess.Popen
+    monkeypatch.setattr(resource_sampler.subprocess, "Popen",
+                        lambda cmd, **kwargs: real_popen([sys.executable, "-c", program], **kwargs))
+
+
+def test_persistent_shell_reads_until_the_end_mark(monkeypatch):
+    local_shell(monkeypatch, (
+        "import sys\n"
+        "for line in sys.stdin:\n"
+        "    if line.startswith('exit'):\n"
+        "        break\n"
+        f"    print('MemTotal: 100 kB'); print('{resource_sampler.END_MARK}', flush=True)\n"
+    ))
+    shell = resource_sampler.PersistentShell(timeout=10)
+    try:
+        assert shell.run("probe") == ["MemTotal: 100 kB\n"]
+        assert shell.run("probe") == ["MemTotal: 100 kB\n"]
+    finally:
+        shell.close()
+    assert shell.proc.returncode == 0
+
+
+def test_persistent_shell_times_out_on_a_stuck_shell(monkeypatch):
+    local_shell(monkeypatch, "import sys, time\nsys.stdin.readline()\ntime.sleep(30)\n")
+    shell = resource_sampler.PersistentShell(timeout=0.2)
+    try:
+        with pytest.raises(TimeoutError):
+            shell.run("probe")
+    finally:
+        shell.close()
+
+
+def test_persistent_shell_reports_a_closed_shell(monkeypatch):
+    local_shell(monkeypatch, "import sys\nsys.stdin.readline()\n")
+    shell = resource_sampler.PersistentShell(timeout=10)
+    try:
+        with pytest.raises(RuntimeError):
+            shell.run("probe")
+    finally:
+        shell.close()
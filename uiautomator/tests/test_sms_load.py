@@ -0,0 +1,173 @@
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import sms_load, sms_verify  # noqa: E402
+from tests.test_sms_verify import FakeProvider  # noqa: E402
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+
+class FakeTracker:
+    """Treats each message as outstanding for `completes_after` seconds after it was queued."""
+
+    def __init__(self, clock, completes_after=None):
+        self.clock = clock
+        self.completes_after = completes_after
+        self.tracked = []
+        self.failed = []
+
+    def track(self, message):
+        self.tracked.append(message)
+
+    def fail(self, message):
+        self.failed.append(message)
+        message.state = sms_load.FAILED
+
+    def outstanding(self):
+        return sum(1 for m in self.tracked if self.clock.now - m.queued_at < self.completes_after)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sms_load.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(sms_load.time, "sleep", clock.sleep)
+    return clock
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    sent = []
+    monkeypatch.setattr(sms_load, "send_one", lambda message, button: sent.append(message))
+    return sent
+
+
+@pytest.mark.parametrize("rate, mode, window", [(0, "open", 3), (None, "open", 3), (-1, "closed", 3),
+                                                (1, "closed", 0), (1, "sideways", 3)])
+def test_invalid_runs_are_rejected(rate, mode, window):
+    with pytest.raises(ValueError):
+        sms_load.LoadRun(["S1"], ["9876543210"], rate, 10, mode, window)
+
+
+def test_messages_are_split_across_devices_with_unique_tags():
+    run = sms_load.LoadRun(["S1", "S2", "S3"], ["111", "222"], 1, 10)
+    batches = [run._messages_for(i, serial) for i, serial in enumerate(run.serials)]
+    assert [len(b) for b in batches] == [4, 3, 3]
+    assert [m.recipient for m in batches[0]] == ["111", "222", "111", "222"]
+    tags = [m.tag for b in batches for m in b]
+    assert len(set(tags)) == 10
+    assert all(m.body.endswith(m.tag) for b in batches for m in b)
+
+
+def test_open_loop_keeps_the_schedule_and_reports_lag(clock, sent, monkeypatch):
+    # Two devices at 1 msg/s overall: each device sends every 2s
+    run = sms_load.LoadRun(["S1", "S2"], ["111"], 1.0, 6)
+    messages = run._messages_for(0, "S1")
+    slow = iter([0, 3.0, 0])
+
+    def send(message, button):
+        sent.append(message)
+        clock.now += next(slow)
+
+    monkeypatch.setattr(sms_load, "send_one", send)
+    run._sender("S1", messages, FakeTracker(clock), (10, 20))
+    assert [round(m.queued_at - 100, 3) for m in messages] == [0, 2, 5]
+    assert [round(m.schedule_lag, 3) for m in messages] == [0, 0, 1]
+
+
+def test_closed_loop_waits_for_the_window(clock, sent):
+    run = sms_load.LoadRun(["S1"], ["111"], None, 4, mode="closed", window=2)
+    messages = run._messages_for(0, "S1")
+    run._sender("S1", messages, FakeTracker(clock, completes_after=1.0), (10, 20))
+    queued = [round(m.queued_at - 100, 3) for m in messages]
+    assert queued[:2] == [0, 0]
+    assert queued[2] >= 1.0 and queued[3] >= 1.0
+    assert len(sent) == 4
+
+
+def test_failed_send_goes_through_the_tracker(clock, monkeypatch):
+    def broken(message, button):
+        raise OSError("adb gone")
+
+    monkeypatch.setattr(sms_load, "send_one", broken)
+    run = sms_load.LoadRun(["S1"], ["111"], 10, 2)
+    tracker = FakeTracker(clock)
+    run._sender("S1", run._messages_for(0, "S1"), tracker, (10, 20))
+    assert [m.state for m in tracker.failed] == [sms_load.FAILED, sms_load.FAILED]
+
+
+@pytest.fixture
+def provider(monkeypatch, clock):
+    fake = FakeProvider()
+    fake.add(1, "111", "old message")
+    monkeypatch.setattr(sms_verify.adb_backend, "run", fake)
+    return fake
+
+
+def queued(tracker, clock, tag):
+    message = sms_load.LoadMessage(None, "111", f"Load test {tag}", tag)
+    message.queued_at = clock.now
+    tracker.track(message)
+    return message
+
+
+def test_tracker_moves_messages_to_sent_and_delivered(provider, clock):
+    tracker = sms_load.DeliveryTracker(None)
+    first = queued(tracker, clock, "[L1-0-0]")
+    second = queued(tracker, clock, "[L1-0-1]")
+    provider.add(2, "111", "Load test [L1-0-0]", sms_type=sms_verify.TYPE_OUTBOX)
+    provider.add(3, "111", "Load test [L1-0-1]", sms_type=sms_verify.TYPE_FAILED)
+
+    tracker.poll()
+    assert (first.state, second.state) == (sms_load.QUEUED, sms_load.FAILED)
+    assert tracker.outstanding() == 1
+
+    clock.now += 2
+    provider.rows[2]["type"] = sms_verify.TYPE_SENT
+    tracker.poll()
+    assert (first.state, first.sms_id, first.sent_at) == (sms_load.SENT, 2, clock.now)
+    assert tracker.outstanding() == 0
+
+    # The delivery report updates the same row, which is watched until then
+    clock.now += 3
+    provider.rows[2]["status"] = sms_verify.STATUS_COMPLETE
+    tracker.poll()
+    assert (first.state, first.delivered_at) == (sms_load.DELIVERED, clock.now)
+    assert tracker.pending == {}
+    assert tracker.verifier._watched == set()
+
+
+def test_tracker_times_out_messages_never_seen(provider, clock):
+    tracker = sms_load.DeliveryTracker(None)
+    message = queued(tracker, clock, "[L1-0-0]")
+    clock.now += sms_load.SENT_TIMEOUT + 1
+    tracker.poll()
+    assert message.state == sms_load.FAILED
+    assert tracker.pending == {}
+
+
+def test_locate_send_button_erases_the_probe_draft(monkeypatch):
+    commands = []
+    monkeypatch.setattr(sms_load.adb_backend, "run", lambda cmd, timeout=None: commands.append(" ".join(cmd)))
+    monkeypatch.setattr(sms_load.config, "wait", lambda key, serial=None: None)
+    monkeypatch.setattr(sms_load.ui_dump, "dump", lambda serial, path: ET.fromstring(
+        '<hierarchy><node resource-id="com.google.android.apps.messaging:id/send_message_button_icon" '
+        'bounds="[900,1800][1000,1900]" /></hierarchy>'))
+
+    assert sms_load.locate_send_button("S1", "111") == (950, 1850)
+    assert commands[-1] == "adb -s S1 shell input keyevent 123 67 67 67 67 67; input keyevent 4 4"
@@ -0,0 +1,103 @@
+import os
+import re
+import subprocess
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import sms_verify  # noqa: E402
+
+
+class FakeProvider:
+    """Answers `content query --uri content://sms` the way the device prints rows."""
+
+    def __init__(self):
+        self.rows = {}
+        self.queries = []
+
+    def add(self, sms_id, address, body, sms_type=sms_verify.TYPE_SENT, status=-1, date=None):
+        self.rows[sms_id] = {"address": address, "body": body, "type": sms_type, "status": status,
+                             "date": int((date or time.time()) * 1000)}
+
+    def __call__(self, cmd, timeout=None):
+        where = cmd[cmd.index("--where") + 1].strip("'")
+        sort = cmd[cmd.index("--sort") + 1].strip("'") if "--sort" in cmd else ""
+        self.queries.append(where)
+        after = int(re.search(r"_id>(\d+)", where).group(1))
+        revisit = re.search(r"_id IN \(([\d,]+)\)", where)
+        revisit = {int(i) for i in revisit.group(1).split(",")} if revisit else set()
+        ids = sorted((i for i in self.rows if i > after or i in revisit), reverse="DESC" in sort)
+        if "LIMIT 1" in sort:
+            ids = ids[:1]
+        out = "".join(
+            f"Row: {n} _id={i}, address={r['address']}, date={r['date']}, type={r['type']}, "
+            f"status={r['status']}, body={r['body']}\n"
+            for n, (i, r) in enumerate((i, self.rows[i]) for i in ids)
+        )
+        return subprocess.CompletedProcess(cmd, 0, out or "No result found.\n", "")
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    fake = FakeProvider()
+    fake.add(1, "+911111111111", "old message")
+    monkeypatch.setattr(sms_verify.adb_backend, "run", fake)
+    monkeypatch.setattr(sms_verify.adb_backend, "is_live", lambda: False)
+    monkeypatch.setattr(sms_verify.adb_backend, "settle", lambda seconds: None)
+    return fake
+
+
+def test_row_regex_keeps_commas_in_the_body():
+    line = "Row: 0 _id=42, address=+91 98765-43210, date=1715680000000, type=2, status=-1, body=Hi, it's me, again"
+    match = sms_verify.ROW_RE.search(line)
+    assert match.group("id") == "42"
+    assert match.group("address") == "+91 98765-43210"
+    assert match.group("body") == "Hi, it's me, again"
+    assert sms_verify.normalize_number(match.group("address")) == "9876543210"
+
+
+def test_fetch_is_incremental_and_revisits_in_flight_rows(provider):
+    verifier = sms_verify.SmsVerifier()
+    assert verifier.last_seen == 1
+
+    provider.add(2, "9876543210", "queued", sms_type=sms_verify.TYPE_OUTBOX)
+    assert [row["id"] for row in verifier.fetch()] == [2]
+    assert provider.queries[-1] == "_id>1"
+
+    provider.rows[2]["type"] = sms_verify.TYPE_SENT
+    assert [row["type"] for row in verifier.fetch()] == [sms_verify.TYPE_SENT]
+    assert provider.queries[-1] == "_id>2 OR _id IN (2)"
+    # Once it has left the outbox it is no longer re-read
+    verifier.fetch()
+    assert provider.queries[-1] == "_id>2"
+
+
+def test_verify_all_matches_each_row_once(provider):
+    verifier = sms_verify.SmsVerifier()
+    sent_at = time.time()
+    first = verifier.expect("+91 98765 43210", "Spam message", sent_at)
+    second = verifier.expect("9876543210", "Spam message", sent_at)
+    third = verifier.expect("9876543210", "Spam message", sent_at)
+    provider.add(2, "9876543210", "Spam message")
+    provider.add(3, "+919876543210", "Spam message ", sms_type=sms_verify.TYPE_FAILED)
+
+    results = verifier.verify_all([first, second, third], timeout=0, poll_interval=0)
+    assert results == [sms_verify.SENT, sms_verify.FAILED, sms_verify.MISSING]
+    assert (first.row["id"], second.row["id"], third.row) == (2, 3, None)
+
+
+def test_verify_reports_pending_and_ignores_rows_outside_the_window(provider):
+    verifier = sms_verify.SmsVerifier(window=60)
+    provider.add(2, "9876543210", "Hello", date=time.time() - 3600)
+    provider.add(3, "9876543210", "Pending hello", sms_type=sms_verify.TYPE_QUEUED)
+
+    stale = verifier.expect("9876543210", "Hello")
+    pending = verifier.expect("9876543210", "Pending hello")
+    assert verifier.verify(stale, timeout=0, poll_interval=0) == sms_verify.MISSING
+    assert verifier.verify(pending, timeout=0, poll_interval=0) == sms_verify.PENDING
+
+    provider.rows[3]["status"] = sms_verify.STATUS_FAILED
+    provider.rows[3]["type"] = sms_verify.TYPE_SENT
+    assert verifier.verify(pending, timeout=0, poll_interval=0) == sms_verify.FAILED
@@ -0,0 +1,67 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import state_scheduler  # noqa: E402
+
+OFF = {"bluetooth": "off"}
+ON = {"bluetooth": "on"}
+
+
+def decl(requires, leaves=None):
+    return requires, leaves or {}
+
+
+def test_order_chains_states_to_minimise_transitions():
+    entries = [
+        ("a", decl(ON)),
+        ("b", decl(OFF)),
+        ("c", decl(ON)),
+        ("d", decl(OFF)),
+        ("e", decl(OFF, ON)),
+    ]
+    ordered = state_scheduler.order(entries, OFF)
+    assert ordered == ["b", "d", "e", "a", "c"]
+
+    by_name = dict(entries)
+    original = state_scheduler.count_transitions(entries, OFF)
+    reordered = state_scheduler.count_transitions([(name, by_name[name]) for name in ordered], OFF)
+    assert (original, reordered) == (4, 0)
+
+
+def test_order_keeps_original_order_on_ties():
+    entries = [(name, decl(ON)) for name in "xyz"]
+    assert state_scheduler.order(entries, ON) == ["x", "y", "z"]
+
+
+def test_undeclared_tests_run_last_and_reset_the_state():
+    entries = [("plain", None), ("a", decl(OFF)), ("b", decl(ON))]
+    assert state_scheduler.order(entries, OFF) == ["a", "b", "plain"]
+    # Nothing is known after an undeclared test, so the next one pays again
+    assert state_scheduler.count_transitions([("plain", None), ("a", decl(OFF))], OFF) == 1
+
+
+def test_declared_state_reads_marks_on_plain_functions():
+    @pytest.mark.device_state(requires=OFF, leaves=ON)
+    def marked():
+        pass
+
+    assert state_scheduler.declared_state(marked) == (OFF, ON)
+    assert state_scheduler.declared_state(lambda: None) is None
+
+
+def test_tracker_skips_transitions_already_satisfied(monkeypatch):
+    issued = []
+    monkeypatch.setattr(state_scheduler.adb_utils, "run_adb_command", issued.append)
+    monkeypatch.setitem(state_scheduler._transitions, ("wifi", "on"), ["shell", "svc", "wifi", "enable"])
+
+    tracker = state_scheduler.DeviceStateTracker()
+    tracker.ensure({"wifi": "on"})
+    tracker.ensure({"wifi": "on"})
+    assert issued == [["shell", "svc", "wifi", "enable"]]
+    assert tracker.transitions_run == 1
+
+    with pytest.raises(KeyError):
+        tracker.ensure({"wifi": "sideways"})
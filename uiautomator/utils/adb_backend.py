@@ -0,0 +1,197 @@
+# utils/adb_backend.py
+#
+# Pluggable execution backend for every adb command issued by the suite.
+#
+#   real    - run the command against the attached device (default)
+#   record  - run against the device and append command + response to a cassette
+#   replay  - serve responses from a cassette, no device or adb binary needed
+#
+# Select with the ADB_BACKEND / ADB_CASSETTE / ADB_REPLAY_LATENCY environment
+# variables, the --adb-backend/--adb-cassette/--adb-replay-latency pytest
+# options, or programmatically with use().
+import atexit
+import base64
+import json
+import os
+import subprocess
+import threading
+import time
+
+from utils import exec_control
+
+BACKEND_ENV = "ADB_BACKEND"
+CASSETTE_ENV = "ADB_CASSETTE"
+LATENCY_ENV = "ADB_REPLAY_LATENCY"
+
+DEFAULT_CASSETTE = os.path.join(os.path.dirname(__file__), '..', 'data', 'adb_cassette.jsonl')
+
+
+class CassetteMissError(LookupError):
+    pass
+
+
+def _key(cmd):
+    return "\x1f".join(str(part) for part in cmd)
+
+
+def _pull_destination(cmd):
+    # adb [-s serial] pull [-a] <remote> [local]
+    if 'pull' not in cmd:
+        return None
+    args = [a for a in cmd[cmd.index('pull') + 1:] if not a.startswith('-')]
+    if not args:
+        return None
+    remote = args[0]
+    local = args[1] if len(args) > 1 else os.path.basename(remote)
+    if os.path.isdir(local):
+        local = os.path.join(local, os.path.basename(remote))
+    return local
+
+
+class RealBackend:
+    name = "real"
+    live = True
+
+    def run(self, cmd, timeout=None):
+        return exec_control.execute(cmd, timeout=timeout)
+
+
+class RecordBackend(RealBackend):
+    name = "record"
+
+    def __init__(self, cassette):
+        self.cassette = cassette
+        self._lock = threading.Lock()
+        self._index = {}
+        os.makedirs(os.path.dirname(os.path.abspath(cassette)), exist_ok=True)
+        # Each recording session starts a fresh cassette
+        open(cassette, 'w', encoding='utf-8').close()
+        atexit.register(self.close)
+
+    def run(self, cmd, timeout=None):
+        start = time.monotonic()
+        result = super().run(cmd, timeout=timeout)
+        entry = {
+            "cmd": list(cmd),
+            "returncode": result.returncode,
+            "stdout": result.stdout,
+            "stderr": result.stderr,
+            "duration": round(time.monotonic() - start, 4),
+        }
+        local = _pull_destination(cmd)
+        if local and result.returncode == 0 and os.path.exists(local):
+            with open(local, 'rb') as f:
+                entry["files"] = {local: base64.b64encode(f.read()).decode('ascii')}
+
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.cassette, 'a', encoding='utf-8') as f:
+                offset = f.tell()
+                f.write(line)
+            self._index.setdefault(_key(cmd), []).append(offset)
+        return result
+
+    def close(self):
+        # Sidecar index lets replay seek straight to an entry without parsing the cassette
+        with self._lock, open(self.cassette + ".idx", 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+
+
+class ReplayBackend:
+    name = "replay"
+    live = False
+
+    def __init__(self, cassette, latency=None):
+        self.cassette = cassette
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._cursor = {}
+        self._index = self._load_index()
+
+    def _load_index(self):
+        idx_path = self.cassette + ".idx"
+        if os.path.exists(idx_path) and os.path.getmtime(idx_path) >= os.path.getmtime(self.cassette):
+            with open(idx_path, encoding='utf-8') as f:
+                return json.load(f)
+
+        index = {}
+        with open(self.cassette, 'rb') as f:
+            offset = f.tell()
+            for line in iter(f.readline, b''):
+                if line.strip():
+                    entry = json.loads(line)
+                    index.setdefault(_key(entry["cmd"]), []).append(offset)
+                offset = f.tell()
+        return index
+
+    def _read_entry(self, offset):
+        with open(self.cassette, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def run(self, cmd, timeout=None):
+        key = _key(cmd)
+        with self._lock:
+            offsets = self._index.get(key)
+            if not offsets:
+                raise CassetteMissError(f"No recorded response for: {' '.join(map(str, cmd))}")
+            # Responses are served in recorded order; the last one repeats so
+            # polling loops (e.g. wait_for_device) settle instead of failing.
+            pos = self._cursor.get(key, 0)
+            self._cursor[key] = pos + 1
+            entry = self._read_entry(offsets[min(pos, len(offsets) - 1)])
+
+        if self.latency == "recorded":
+            time.sleep(entry.get("duration", 0))
+        elif self.latency:
+            time.sleep(float(self.latency))
+
+        for path, payload in entry.get("files", {}).items():
+            with open(path, 'wb') as f:
+                f.write(base64.b64decode(payload))
+
+        return subprocess.CompletedProcess(cmd, entry["returncode"], entry["stdout"], entry["stderr"])
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def use(mode=None, cassette=None, latency=None):
+    global _backend
+    mode = mode or os.environ.get(BACKEND_ENV, "real")
+    cassette = cassette or os.environ.get(CASSETTE_ENV, DEFAULT_CASSETTE)
+    latency = latency if latency is not None else os.environ.get(LATENCY_ENV)
+
+    if mode == "real":
+        backend = RealBackend()
+    elif mode == "record":
+        backend = RecordBackend(cassette)
+    elif mode == "replay":
+        backend = ReplayBackend(cassette, latency)
+    else:
+        raise ValueError(f"Unknown adb backend '{mode}' (expected real, record or replay)")
+
+    with _backend_lock:
+        _backend = backend
+    return backend
+
+
+def get_backend():
+    with _backend_lock:
+        backend = _backend
+    return backend if backend is not None else use()
+
+
+def run(cmd, timeout=None):
+    return get_backend().run(list(cmd), timeout=timeout)
+
+
+def is_live():
+    return get_backend().live
+
+
+def settle(seconds):
+    # Waits that only exist to give the device time to react are skipped on replay
+    if is_live():
+        time.sleep(seconds)
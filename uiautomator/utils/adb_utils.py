@@ -1,13 +1,28 @@
 # utils/adb_utils.py
-import subprocess
+from utils import adb_backend, exec_control, logger
+
+log = logger.setup_logger()
 
 def run_adb_command(cmd_list):
     try:
         full_cmd = ['adb'] + cmd_list
-        result = subprocess.run(full_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=False)
+        result = adb_backend.run(full_cmd)
         if result.stderr:
-            print(f"ADB Error: {result.stderr.strip()}")
+            log.error(f"ADB Error: {result.stderr.strip()}")
         return result.stdout.strip()
+    except (exec_control.DeadlineExceeded, exec_control.DeviceUnavailableError):
+        # A dead device or an expired test must not look like empty output
+        raise
     except Exception as e:
-        print(f"ADB Command Failed: {e}")
+        log.error(f"ADB Command Failed: {e}")
         return ""
+
+_device_info = {}
+
+def get_device_info():
+    if not _device_info:
+        output = run_adb_command(['shell', 'getprop ro.product.model; getprop ro.build.fingerprint'])
+        lines = output.splitlines() + ["", ""]
+        _device_info["model"] = lines[0].strip() or "unknown"
+        _device_info["build"] = lines[1].strip() or "unknown"
+    return dict(_device_info)
@@ -0,0 +1,101 @@
+# utils/bt_metrics.py
+#
+# Bluetooth enable/disable latency extracted from adapter state-change events
+# in a threadtime logcat dump. Per-test samples are appended to
+# reports/bt_latency.csv; summarize() writes per-device/per-build percentiles.
+import csv
+import json
+import os
+import re
+from datetime import datetime
+
+from utils import config, logcat_parser, stats
+
+REPORT_DIR = config.get_path("paths.reports_dir", "reports")
+SAMPLES_FILE = os.path.join(REPORT_DIR, "bt_latency.csv")
+SUMMARY_FILE = os.path.join(REPORT_DIR, "bt_latency_summary.json")
+
+STATE_TAGS = [
+    "BluetoothManagerService",
+    "BluetoothAdapter",
+    "BluetoothAdapterService",
+    "BluetoothAdapterState",
+    "AdapterState",
+]
+
+# BluetoothAdapter.STATE_* constants, for builds that log numeric states
+STATE_CODES = {
+    "10": "OFF", "11": "TURNING_ON", "12": "ON", "13": "TURNING_OFF",
+    "14": "BLE_TURNING_ON", "15": "BLE_ON", "16": "BLE_TURNING_OFF",
+}
+_STATE = r"(BLE_TURNING_ON|BLE_TURNING_OFF|BLE_ON|TURNING_ON|TURNING_OFF|ON|OFF)"
+NAMED_CHANGE_RE = re.compile(r"\b" + _STATE + r"\s*(?:->|>|to)\s*" + _STATE + r"\b")
+NUMERIC_CHANGE_RE = re.compile(r"prev(?:ious)?State\s*[=:]\s*(1[0-6]).*?new(?:State)?\s*[=:]\s*(1[0-6])")
+
+
+def state_changes(frame):
+    changes = []
+    for row in frame.rows(tags=STATE_TAGS):
+        message = frame.message[row]
+        match = NAMED_CHANGE_RE.search(message)
+        if match:
+            changes.append((frame.time_ms[row], match.group(1), match.group(2)))
+            continue
+        match = NUMERIC_CHANGE_RE.search(message)
+        if match:
+            changes.append((frame.time_ms[row], STATE_CODES[match.group(1)], STATE_CODES[match.group(2)]))
+    return changes
+
+
+def latencies(frame):
+    # Several tags report the same transition; the first report opens a
+    # measurement and the first report of the final state closes it.
+    results = []
+    enable_start = disable_start = None
+    for time_ms, old, new in state_changes(frame):
+        if old == "OFF" and new in ("TURNING_ON", "BLE_TURNING_ON") and enable_start is None:
+            enable_start = time_ms
+        elif new == "ON" and enable_start is not None:
+            results.append(("enable", time_ms - enable_start))
+            enable_start = None
+        elif old == "ON" and new == "TURNING_OFF" and disable_start is None:
+            disable_start = time_ms
+        elif new == "OFF" and disable_start is not None:
+            results.append(("disable", time_ms - disable_start))
+            disable_start = None
+    return results
+
+
+def record(test_name, logcat_text, device):
+    samples = latencies(logcat_parser.parse(logcat_text))
+    if not samples:
+        return samples
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    new_file = not os.path.exists(SAMPLES_FILE)
+    with open(SAMPLES_FILE, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(["Timestamp", "Model", "Build", "Test", "Transition", "Latency (ms)"])
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for kind, latency_ms in samples:
+            writer.writerow([now, device["model"], device["build"], test_name, kind, latency_ms])
+    return samples
+
+
+def summarize():
+    if not os.path.exists(SAMPLES_FILE):
+        return {}
+    grouped = {}
+    with open(SAMPLES_FILE, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            key = (row["Model"], row["Build"], row["Transition"])
+            grouped.setdefault(key, []).append(int(row["Latency (ms)"]))
+
+    summary = {}
+    for (model, build, kind), values in sorted(grouped.items()):
+        summary.setdefault(model, {}).setdefault(build, {})[kind] = stats.summarize(values)
+
+    with open(SUMMARY_FILE, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return summary
@@ -0,0 +1,122 @@
+# utils/calibrate.py
+#
+# Measures how slow the connected device is and writes a timing profile for
+# its model into config/timing_profiles.yaml.
+#
+#   launch  - `am start -W` TotalTime of a warm Settings launch
+#   ui_dump - wall-clock of `uiautomator dump` + pull
+#   input   - round trip of a no-op `input keyevent`
+#
+# Each wait in timing.default was tuned on a device that measures REFERENCE_MS;
+# the profile scales it by measured p90 / reference for the quantity it waits on.
+#
+# Usage:
+#   python -m utils.calibrate --samples 5
+#   python -m utils.calibrate --dry-run
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import adb_backend, adb_utils, config, launch_benchmark, logger, stats, ui_dump  # noqa: E402
+
+log = logger.setup_logger()
+
+CALIBRATION_COMPONENT = "com.android.settings/.Settings"
+REFERENCE_MS = {"launch": 800.0, "ui_dump": 1500.0, "input": 250.0}
+MIN_FACTOR = 0.5
+MAX_FACTOR = 4.0
+
+# Which measurement each wait scales with; the rest (polls, network and
+# provider timeouts) do not depend on device speed and keep the default.
+SCALES_WITH = {
+    "launch_settle": "launch",
+    "search_settle": "launch",
+    "intent_settle": "launch",
+    "heavy_app_settle": "launch",
+    "boot_settle": "launch",
+    "post_reboot_wait": "launch",
+    "send_wait": "ui_dump",
+    "ui_settle": "input",
+    "text_settle": "input",
+    "settings_settle": "input",
+}
+
+
+def _timed(fn):
+    started = time.monotonic()
+    fn()
+    return round((time.monotonic() - started) * 1000)
+
+
+def measure(samples=5):
+    launch = launch_benchmark.benchmark("com.android.settings", "warm", samples, CALIBRATION_COMPONENT)
+
+    dump_path = os.path.join(tempfile.gettempdir(), "calibrate_dump.xml")
+    dumps = [_timed(lambda: ui_dump.dump(None, dump_path)) for _ in range(samples)]
+    inputs = [_timed(lambda: adb_utils.run_adb_command(['shell', 'input', 'keyevent', '0']))
+              for _ in range(samples)]
+    adb_utils.run_adb_command(['shell', 'input', 'keyevent', '3'])
+
+    return {
+        "launch": launch["total_time"],
+        "ui_dump": stats.summarize(dumps),
+        "input": stats.summarize(inputs),
+    }
+
+
+def build_profile(measured):
+    factors = {}
+    for name, reference in REFERENCE_MS.items():
+        p90 = measured[name].get("p90")
+        factor = p90 / reference if p90 else 1.0
+        factors[name] = min(MAX_FACTOR, max(MIN_FACTOR, factor))
+
+    defaults = config.get("timing.default", {})
+    profile = {}
+    for key, basis in SCALES_WITH.items():
+        if key in defaults:
+            profile[key] = round(float(defaults[key]) * factors[basis], 1)
+    profile["calibrated_ms"] = {name: measured[name].get("p90") for name in REFERENCE_MS}
+    profile["calibrated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return profile
+
+
+def save_profile(model, profile):
+    profiles = dict(config.load_profiles())
+    profiles[model] = profile
+    config.save_profiles(profiles)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibrate per-device-model waits and timeouts")
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--dry-run", action="store_true", help="Print the profile without saving it")
+    args = parser.parse_args(argv)
+
+    if not adb_backend.is_live():
+        print("Calibration needs a live device (ADB_BACKEND=real)")
+        return 1
+
+    model = config.device_model()
+    measured = measure(args.samples)
+    profile = build_profile(measured)
+    for name in REFERENCE_MS:
+        print(f"{name:8} p50={measured[name].get('p50')}ms p90={measured[name].get('p90')}ms "
+              f"(reference {REFERENCE_MS[name]:.0f}ms)")
+    for key in SCALES_WITH:
+        if key in profile:
+            print(f"  {key:18} {config.timing(key)}s -> {profile[key]}s")
+
+    if not args.dry_run:
+        save_profile(model, profile)
+        log.info(f"[Calibrate] Saved timing profile for '{model}' to {config.PROFILES_FILE}")
+        print(f"Saved profile for '{model}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+# utils/config.py
+#
+# config/config.yaml is read once per process and cached; timing() resolves a
+# wait for the connected device model from its calibrated profile, falling
+# back to timing.default.
+import functools
+import os
+import threading
+
+import yaml
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+CONFIG_FILE = os.environ.get("UIAUTOMATOR_CONFIG", os.path.join(BASE_DIR, 'config', 'config.yaml'))
+# Written by utils.calibrate, kept apart so config.yaml is never rewritten
+PROFILES_FILE = os.path.join(os.path.dirname(CONFIG_FILE), 'timing_profiles.yaml')
+
+_write_lock = threading.Lock()
+
+
+def _read(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+@functools.lru_cache(maxsize=None)
+def load():
+    return _read(CONFIG_FILE)
+
+
+@functools.lru_cache(maxsize=None)
+def load_profiles():
+    return _read(PROFILES_FILE)
+
+
+def reload():
+    load.cache_clear()
+    load_profiles.cache_clear()
+    _profile_for.cache_clear()
+    return load()
+
+
+def get(path, default=None):
+    node = load()
+    for part in path.split("."):
+        if not isinstance(node, dict) or part not in node:
+            return default
+        node = node[part]
+    return node
+
+
+def get_path(path, default):
+    value = get(path, default)
+    return value if os.path.isabs(value) else os.path.join(BASE_DIR, value)
+
+
+def save_profiles(profiles):
+    with _write_lock:
+        with open(PROFILES_FILE, "w", encoding="utf-8") as f:
+            yaml.safe_dump(profiles, f, sort_keys=False, default_flow_style=False)
+    reload()
+
+
+@functools.lru_cache(maxsize=None)
+def _profile_for(model):
+    # Calibrated values win over hand-written ones in config.yaml
+    profile = dict(get(f"timing.profiles.{model}", {}) or {})
+    profile.update(load_profiles().get(model, {}) or {})
+    return profile
+
+
+@functools.lru_cache(maxsize=None)
+def device_model(serial=None):
+    # Imported here: adb_utils -> adb_backend -> exec_control reads this module
+    from utils import adb_utils
+
+    if serial is None:
+        return adb_utils.get_device_info()["model"]
+    output = adb_utils.run_adb_command(['-s', serial, 'shell', 'getprop', 'ro.product.model'])
+    return output.strip() or "unknown"
+
+
+def timing(key, serial=None, default=None):
+    value = _profile_for(device_model(serial)).get(key)
+    if value is None:
+        value = get(f"timing.default.{key}", default)
+    if value is None:
+        raise KeyError(f"No timing configured for '{key}'")
+    return float(value)
+
+
+def wait(key, serial=None):
+    from utils import adb_backend
+
+    adb_backend.settle(timing(key, serial))
@@ -0,0 +1,114 @@
+# utils/device_snapshot.py
+#
+# Snapshot the device settings (global/secure/system) and radio states in one
+# adb round trip, and restore only the keys a test changed in one more.
+import contextlib
+import shlex
+
+import pytest
+
+from utils import adb_backend, logger
+
+log = logger.setup_logger()
+
+NAMESPACES = ("global", "secure", "system")
+SECTION_MARK = "##uia-snapshot:"
+
+# Settings that only mirror a radio; restoring them needs svc/broadcast, not settings put
+RADIO_RESTORE = {
+    ("global", "wifi_on"): lambda v: [f"svc wifi {'disable' if v == '0' else 'enable'}"],
+    ("global", "mobile_data"): lambda v: [f"svc data {'disable' if v == '0' else 'enable'}"],
+    ("global", "bluetooth_on"): lambda v: [f"svc bluetooth {'disable' if v == '0' else 'enable'}"],
+    ("global", "airplane_mode_on"): lambda v: [
+        f"settings put global airplane_mode_on {v}",
+        f"am broadcast -a android.intent.action.AIRPLANE_MODE --ez state {'false' if v == '0' else 'true'}",
+    ],
+}
+
+# Keys the system rewrites on its own; restoring them is noise at best
+VOLATILE = {
+    ("global", "boot_count"),
+    ("global", "wifi_scan_throttle_enabled"),
+    ("secure", "sleep_timeout"),
+    ("system", "screen_brightness"),
+    ("system", "next_alarm_formatted"),
+}
+
+
+def _adb(serial):
+    return ["adb", "-s", serial] if serial else ["adb"]
+
+
+def capture(serial=None):
+    script = "; ".join(
+        f"echo '{SECTION_MARK}{ns}'; settings list {ns}" for ns in NAMESPACES
+    )
+    result = adb_backend.run(_adb(serial) + ["shell", script])
+
+    snapshot = {}
+    namespace = None
+    for line in result.stdout.splitlines():
+        if line.startswith(SECTION_MARK):
+            namespace = line[len(SECTION_MARK):].strip()
+            continue
+        if namespace is None or "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        snapshot[(namespace, key)] = value
+    return snapshot
+
+
+def diff(before, after):
+    changed = {}
+    for key in set(before) | set(after):
+        if key in VOLATILE:
+            continue
+        if before.get(key) != after.get(key):
+            changed[key] = before.get(key)
+    return changed
+
+
+def restore_commands(changed):
+    commands = []
+    radios = []
+    for (namespace, key), value in sorted(changed.items()):
+        if (namespace, key) in RADIO_RESTORE:
+            if value is not None:
+                radios.extend(RADIO_RESTORE[(namespace, key)](value))
+        elif value is None:
+            commands.append(f"settings delete {namespace} {shlex.quote(key)}")
+        else:
+            commands.append(f"settings put {namespace} {shlex.quote(key)} {shlex.quote(value)}")
+    # Radios last so e.g. airplane mode does not fight a later wifi_on restore
+    return commands + radios
+
+
+def restore(before, serial=None):
+    changed = diff(before, capture(serial))
+    if not changed:
+        return {}
+    commands = restore_commands(changed)
+    log.info(f"[Snapshot] Restoring {len(changed)} changed setting(s)")
+    result = adb_backend.run(_adb(serial) + ["shell", "; ".join(commands)])
+    if result.stderr.strip():
+        log.error(f"[Snapshot] Restore reported: {result.stderr.strip()}")
+    return changed
+
+
+@contextlib.contextmanager
+def preserved(serial=None):
+    before = capture(serial)
+    try:
+        yield before
+    finally:
+        changed = restore(before, serial)
+        if any(key in RADIO_RESTORE for key in changed):
+            # Keep the state scheduler honest about radios we just flipped back
+            from utils.state_scheduler import tracker
+            tracker.invalidate()
+
+
+@pytest.fixture
+def device_snapshot():
+    with preserved() as before:
+        yield before
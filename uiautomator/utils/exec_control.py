@@ -0,0 +1,259 @@
+# utils/exec_control.py
+#
+# Execution control for adb commands:
+#
+#   - every command gets a deadline (per command, capped by the running test's
+#     deadline); on expiry the whole process group is killed so a wedged adb
+#     cannot outlive it
+#   - transient transport failures are retried a bounded number of times with
+#     jittered exponential backoff
+#   - a per-device circuit breaker opens after repeated device-level failures
+#     and fails queued work fast until a cool-down probe succeeds
+#
+# pytest: @pytest.mark.deadline(seconds) or --test-deadline=SECONDS.
+import contextlib
+import os
+import random
+import re
+import signal
+import subprocess
+import threading
+import time
+
+import pytest
+
+from utils import config, logger
+
+log = logger.setup_logger()
+
+DEFAULT_COMMAND_TIMEOUT = float(os.environ.get("ADB_COMMAND_TIMEOUT", config.get("timeouts.adb_command", 60)))
+MAX_RETRIES = 2
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 5.0
+BREAKER_THRESHOLD = 3
+BREAKER_COOLDOWN = 30.0
+
+TRANSIENT_RE = re.compile(
+    r"device offline|device '.*' not found|no devices/emulators found|protocol fault|"
+    r"connection reset|failed to connect|error: closed|transport error",
+    re.IGNORECASE,
+)
+UNAUTHORIZED_RE = re.compile(r"unauthorized|still authorizing", re.IGNORECASE)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class DeviceUnavailableError(RuntimeError):
+    pass
+
+
+# ----------- Deadlines ----------- #
+
+_deadline = threading.local()
+
+
+def remaining():
+    expires = getattr(_deadline, "expires", None)
+    return None if expires is None else expires - time.monotonic()
+
+
+@contextlib.contextmanager
+def deadline(seconds):
+    previous = getattr(_deadline, "expires", None)
+    expires = time.monotonic() + seconds
+    # Nested deadlines can only tighten the outer one
+    _deadline.expires = expires if previous is None else min(previous, expires)
+    try:
+        yield
+    finally:
+        _deadline.expires = previous
+
+
+def _effective_timeout(timeout):
+    timeout = DEFAULT_COMMAND_TIMEOUT if timeout is None else timeout
+    left = remaining()
+    if left is not None:
+        if left <= 0:
+            raise DeadlineExceeded("Test deadline already expired")
+        timeout = min(timeout, left)
+    return timeout
+
+
+# ----------- Expected outages ----------- #
+
+_outage = threading.local()
+
+
+def in_expected_outage():
+    return getattr(_outage, "depth", 0) > 0
+
+
+@contextlib.contextmanager
+def expected_outage():
+    # The device is meant to disappear (reboot, USB re-enumeration): transport
+    # failures are returned as they are, not retried and not held against the
+    # device's circuit breaker
+    _outage.depth = getattr(_outage, "depth", 0) + 1
+    try:
+        yield
+    finally:
+        _outage.depth -= 1
+
+
+# ----------- Circuit breaker ----------- #
+
+class CircuitBreaker:
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def before_call(self, device):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.cooldown:
+                raise DeviceUnavailableError(f"Device {device} unavailable (circuit open), failing fast")
+            # Half-open: let this call through as a probe; one more failure re-opens
+            self.failures = self.threshold - 1
+            self.opened_at = None
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self, device, reason):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold and self.opened_at is None:
+                self.opened_at = time.monotonic()
+                log.error(f"[Exec] Circuit opened for device {device} after {self.failures} failures: {reason}")
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def device_of(cmd):
+    if "-s" in cmd[:-1]:
+        return cmd[cmd.index("-s") + 1]
+    return os.environ.get("ANDROID_SERIAL", "default")
+
+
+def breaker_for(device):
+    with _breakers_lock:
+        if device not in _breakers:
+            _breakers[device] = CircuitBreaker()
+        return _breakers[device]
+
+
+# ----------- Execution ----------- #
+
+def _kill_group(proc):
+    try:
+        if os.name == "nt":
+            proc.kill()
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError, OSError):
+        pass
+
+
+def run_process(cmd, timeout):
+    kwargs = {}
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+
+    proc = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        text=True, encoding='utf-8', errors='replace', **kwargs
+    )
+    try:
+        stdout, stderr = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _kill_group(proc)
+        proc.communicate()
+        raise DeadlineExceeded(f"Command exceeded {timeout:.1f}s and was killed: {' '.join(cmd)}")
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+
+def execute(cmd, timeout=None, retries=MAX_RETRIES):
+    device = device_of(cmd)
+    breaker = breaker_for(device)
+
+    outage = in_expected_outage()
+    attempt = 0
+    while True:
+        if not outage:
+            breaker.before_call(device)
+        try:
+            result = run_process(cmd, _effective_timeout(timeout))
+        except DeadlineExceeded as e:
+            if not outage:
+                breaker.record_failure(device, "hung command")
+            log.error(f"[Exec] {e}")
+            raise
+
+        stderr = result.stderr or ""
+        if outage:
+            if result.returncode == 0:
+                breaker.record_success()
+            return result
+
+        if result.returncode != 0 and UNAUTHORIZED_RE.search(stderr):
+            breaker.record_failure(device, "unauthorized")
+            raise DeviceUnavailableError(f"Device {device} is unauthorized: {stderr.strip()}")
+
+        if result.returncode != 0 and TRANSIENT_RE.search(stderr):
+            # One failed command is one failure for the breaker, however many
+            # attempts it took to give up on it
+            if attempt >= retries:
+                breaker.record_failure(device, stderr.strip())
+                return result
+            attempt += 1
+            # Full jitter keeps a farm of runners from retrying in lockstep
+            delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+            left = remaining()
+            if left is not None and delay >= left:
+                breaker.record_failure(device, stderr.strip())
+                return result
+            log.info(f"[Exec] Transient failure on {device} ({stderr.strip()}), retry {attempt} in {delay:.2f}s")
+            time.sleep(delay)
+            continue
+
+        breaker.record_success()
+        return result
+
+
+# ----------- pytest plugin ----------- #
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "deadline(seconds): fail the test's adb commands once it runs this long")
+
+
+def pytest_addoption(parser):
+    parser.getgroup("adb").addoption(
+        "--test-deadline", type=float, default=None, metavar="SECONDS",
+        help="Default per-test deadline for adb commands",
+    )
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    # Only the test body runs under the deadline; fixture teardown (snapshot
+    # restore, radio cleanup) must still be able to reach the device after
+    # the test has run out of time
+    marker = item.get_closest_marker("deadline")
+    seconds = marker.args[0] if marker else item.config.getoption("--test-deadline")
+    if not seconds:
+        yield
+        return
+    with deadline(seconds):
+        yield
@@ -0,0 +1,205 @@
+# utils/launch_benchmark.py
+#
+# App launch benchmark driven by `am start -W`, which reports the device-side
+# launch time instead of host wall-clock.
+#
+#   cold - force-stop and drop page cache before every launch; dropping the
+#          cache needs root, without it the result is flagged cache_dropped=False
+#   warm - process alive, activity destroyed before every launch. BACK no
+#          longer finishes a root activity on Android 12+, so the run turns on
+#          "don't keep activities" and sends HOME, restoring the setting after
+#   hot  - activity alive in the background, sent HOME before every launch
+#
+# Usage:
+#   python -m utils.launch_benchmark com.android.vending --mode cold --iterations 10
+#   python -m utils.launch_benchmark com.android.vending --all-modes --save-baseline
+import argparse
+import contextlib
+import json
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import adb_backend, adb_utils, logger, stats  # noqa: E402
+
+log = logger.setup_logger()
+
+MODES = ("cold", "warm", "hot")
+BASELINE_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'launch_baselines.json'))
+DEFAULT_TOLERANCE = 0.15
+
+TIME_RE = re.compile(r"^(TotalTime|WaitTime|ThisTime):\s*(\d+)", re.MULTILINE)
+
+
+def resolve_component(package):
+    output = adb_utils.run_adb_command([
+        'shell', 'cmd', 'package', 'resolve-activity', '--brief',
+        '-c', 'android.intent.category.LAUNCHER', package
+    ])
+    lines = [line.strip() for line in output.splitlines() if "/" in line]
+    if not lines:
+        raise ValueError(f"No launcher activity found for {package}")
+    return lines[-1]
+
+
+_root = {}
+
+
+def has_root():
+    if "shell" not in _root:
+        _root["shell"] = adb_utils.run_adb_command(['shell', 'id', '-u']).strip() == "0"
+        if not _root["shell"]:
+            log.info("[Launch] adb shell is not root; cold launches will run without dropping the page cache")
+    return _root["shell"]
+
+
+@contextlib.contextmanager
+def activities_not_kept():
+    previous = adb_utils.run_adb_command(['shell', 'settings', 'get', 'global', 'always_finish_activities']).strip()
+    adb_utils.run_adb_command(['shell', 'settings', 'put', 'global', 'always_finish_activities', '1'])
+    try:
+        yield
+    finally:
+        restore = previous if previous in ("0", "1") else "0"
+        adb_utils.run_adb_command(['shell', 'settings', 'put', 'global', 'always_finish_activities', restore])
+
+
+def prepare(package, mode):
+    if mode == "cold":
+        script = f"am force-stop {package}"
+        if has_root():
+            script += "; sync; echo 3 > /proc/sys/vm/drop_caches"
+        adb_utils.run_adb_command(['shell', script])
+    elif mode in ("warm", "hot"):
+        # For warm runs "don't keep activities" is on, so HOME destroys the activity
+        adb_utils.run_adb_command(['shell', 'input', 'keyevent', '3'])
+    else:
+        raise ValueError(f"Unknown launch mode '{mode}' (expected one of {', '.join(MODES)})")
+    adb_backend.settle(1)
+
+
+def launch_once(component):
+    output = adb_utils.run_adb_command(['shell', 'am', 'start', '-W', '-n', component])
+    times = {key: int(value) for key, value in TIME_RE.findall(output)}
+    if "TotalTime" not in times and "WaitTime" not in times:
+        raise RuntimeError(f"am start -W returned no timing for {component}: {output}")
+    return times
+
+
+def reject_outliers(values):
+    # Tukey fences; too few samples to say anything about the spread
+    if len(values) < 4:
+        return list(values), []
+    q1 = stats.percentile(values, 25)
+    q3 = stats.percentile(values, 75)
+    spread = (q3 - q1) * 1.5
+    kept = [v for v in values if q1 - spread <= v <= q3 + spread]
+    rejected = [v for v in values if not q1 - spread <= v <= q3 + spread]
+    return kept, rejected
+
+
+def benchmark(package, mode="cold", iterations=10, component=None):
+    component = component or resolve_component(package)
+    if mode in ("warm", "hot"):
+        # Prime the process so the first measured iteration is not a cold start
+        launch_once(component)
+        adb_backend.settle(2)
+
+    total, wait = [], []
+    with activities_not_kept() if mode == "warm" else contextlib.nullcontext():
+        for i in range(iterations):
+            prepare(package, mode)
+            times = launch_once(component)
+            total.append(times.get("TotalTime", times.get("WaitTime")))
+            wait.append(times.get("WaitTime", times.get("TotalTime")))
+            log.info(f"[Launch] {package} {mode} #{i + 1}: TotalTime={total[-1]}ms WaitTime={wait[-1]}ms")
+
+    kept, rejected = reject_outliers(total)
+    if rejected:
+        log.info(f"[Launch] Rejected outliers for {package} {mode}: {rejected}")
+
+    device = adb_utils.get_device_info()
+    return {
+        "package": package,
+        "component": component,
+        "mode": mode,
+        "model": device["model"],
+        "build": device["build"],
+        "iterations": iterations,
+        "cache_dropped": mode == "cold" and has_root(),
+        "rejected": rejected,
+        "total_time": stats.summarize(kept),
+        "wait_time": stats.summarize(reject_outliers(wait)[0]),
+    }
+
+
+def _baseline_key(result):
+    mode = result["mode"]
+    if mode == "cold" and not result.get("cache_dropped", True):
+        # Never compare a warm-cache "cold" run with a real one
+        mode = "cold-no-drop"
+    return "|".join([result["model"], result["build"], result["package"], mode])
+
+
+def load_baselines():
+    if not os.path.exists(BASELINE_FILE):
+        return {}
+    with open(BASELINE_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(result):
+    baselines = load_baselines()
+    baselines[_baseline_key(result)] = result["total_time"]
+    os.makedirs(os.path.dirname(BASELINE_FILE), exist_ok=True)
+    with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+
+
+def compare(result, tolerance=DEFAULT_TOLERANCE):
+    baseline = load_baselines().get(_baseline_key(result))
+    if not baseline or not result["total_time"].get("count"):
+        return None
+    current = result["total_time"]["p50"]
+    delta = (current - baseline["p50"]) / baseline["p50"] if baseline["p50"] else 0.0
+    return {
+        "baseline_p50": baseline["p50"],
+        "current_p50": current,
+        "delta": round(delta, 3),
+        "regressed": delta > tolerance,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark app launch time with am start -W")
+    parser.add_argument("package")
+    parser.add_argument("--component", default=None, help="package/.Activity (default: launcher activity)")
+    parser.add_argument("--mode", choices=MODES, default="cold")
+    parser.add_argument("--all-modes", action="store_true")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    regressed = False
+    for mode in (MODES if args.all_modes else (args.mode,)):
+        result = benchmark(args.package, mode, args.iterations, args.component)
+        summary = result["total_time"]
+        print(f"{args.package} [{mode}] TotalTime mean={summary.get('mean')} p50={summary.get('p50')} "
+              f"p90={summary.get('p90')} p99={summary.get('p99')} (n={summary['count']}, "
+              f"{len(result['rejected'])} outliers)")
+        if mode == "cold" and not result["cache_dropped"]:
+            print("  page cache not dropped (no root): cold times are optimistic")
+        verdict = compare(result, args.tolerance)
+        if verdict:
+            regressed = regressed or verdict["regressed"]
+            print(f"  vs baseline p50={verdict['baseline_p50']}: {verdict['delta']:+.1%}"
+                  f"{'  REGRESSION' if verdict['regressed'] else ''}")
+        if args.save_baseline:
+            save_baseline(result)
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
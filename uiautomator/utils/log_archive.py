@@ -0,0 +1,217 @@
+# utils/log_archive.py
+#
+# Compressed, indexed archive of per-test logcat dumps.
+#
+#   <root>/catalog.jsonl                 one line per archived run
+#   <root>/runs/<date>/<name>.logz       independent zlib blocks of BLOCK_LINES lines
+#   <root>/runs/<date>/<name>.idx        header, block table, tag table, fixed-size line records
+#
+# search() mmaps the .idx files, filters the line records on tag/pid/level/time
+# and only decompresses the blocks that hold a match.
+#
+# Usage:
+#   python -m utils.log_archive search --tag BluetoothAdapter --level E --last 500
+#   python -m utils.log_archive list --last 20
+import argparse
+import bisect
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import config, logcat_parser  # noqa: E402
+
+LOG_DIR_ENV = "UIAUTOMATOR_LOG_DIR"
+DEFAULT_LOG_DIR = config.get_path("paths.log_dir", "logs")
+
+BLOCK_LINES = 512
+MAGIC = b"UIAX"
+VERSION = 1
+HEADER = struct.Struct("<4sHIII")      # magic, version, blocks, records, tag table bytes
+BLOCK = struct.Struct("<QII")          # offset, compressed length, first line number
+RECORD = struct.Struct("<qiBII")       # time_ms, pid, level, tag id, line number
+
+_catalog_lock = threading.Lock()
+
+
+def log_root(root=None):
+    return root or os.environ.get(LOG_DIR_ENV, DEFAULT_LOG_DIR)
+
+
+def _safe_name(name):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+
+
+def archive_logcat(test_name, text, root=None, run_time=None):
+    root = log_root(root)
+    run_time = run_time or datetime.now()
+    day_dir = os.path.join(root, "runs", run_time.strftime("%Y-%m-%d"))
+    os.makedirs(day_dir, exist_ok=True)
+    base = os.path.join(day_dir, f"{_safe_name(test_name)}_{run_time.strftime('%H-%M-%S-%f')}")
+
+    lines = text.splitlines()
+    tags = {}
+    records = []
+    for line_no, line in enumerate(lines):
+        parsed = logcat_parser.parse_line(line, run_time.year)
+        if parsed is None:
+            continue
+        time_ms, pid, _, level, tag, _ = parsed
+        tag_id = tags.setdefault(tag, len(tags))
+        records.append(RECORD.pack(time_ms, pid, logcat_parser.LEVELS.index(level), tag_id, line_no))
+
+    blocks = []
+    with open(base + ".logz", "wb") as f:
+        for first in range(0, len(lines), BLOCK_LINES):
+            chunk = "\n".join(lines[first:first + BLOCK_LINES]).encode("utf-8")
+            data = zlib.compress(chunk, 6)
+            blocks.append(BLOCK.pack(f.tell(), len(data), first))
+            f.write(data)
+
+    tag_table = json.dumps(sorted(tags, key=tags.get)).encode("utf-8")
+    with open(base + ".idx", "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(blocks), len(records), len(tag_table)))
+        f.write(b"".join(blocks))
+        f.write(tag_table)
+        f.write(b"".join(records))
+
+    entry = {
+        "test": test_name,
+        "time": run_time.strftime("%Y-%m-%d %H:%M:%S"),
+        "log": os.path.relpath(base, root),
+        "lines": len(lines),
+    }
+    with _catalog_lock, open(os.path.join(root, "catalog.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+    return base + ".logz"
+
+
+def runs(root=None, last=None, test=None):
+    path = os.path.join(log_root(root), "catalog.jsonl")
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    if test:
+        entries = [e for e in entries if e["test"] == test]
+    return entries[-last:] if last else entries
+
+
+def _search_run(base, tag, pid, levels, since_ms, until_ms):
+    with open(base + ".idx", "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        magic, version, nblocks, nrecords, tag_bytes = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Unsupported index: {base}.idx")
+        pos = HEADER.size
+        block_table = [BLOCK.unpack_from(mm, pos + i * BLOCK.size) for i in range(nblocks)]
+        pos += nblocks * BLOCK.size
+        tag_names = json.loads(mm[pos:pos + tag_bytes].decode("utf-8"))
+        pos += tag_bytes
+
+        tag_id = None
+        if tag is not None:
+            if tag not in tag_names:
+                return []
+            tag_id = tag_names.index(tag)
+
+        view = memoryview(mm)[pos:pos + nrecords * RECORD.size]
+        try:
+            hits = [
+                rec for rec in RECORD.iter_unpack(view)
+                if (tag_id is None or rec[3] == tag_id)
+                and (pid is None or rec[1] == pid)
+                and (levels is None or rec[2] in levels)
+                and (since_ms is None or rec[0] >= since_ms)
+                and (until_ms is None or rec[0] <= until_ms)
+            ]
+        finally:
+            view.release()
+
+    if not hits:
+        return []
+
+    firsts = [b[2] for b in block_table]
+    wanted = {}
+    for rec in hits:
+        wanted.setdefault(bisect.bisect_right(firsts, rec[4]) - 1, []).append(rec)
+
+    results = []
+    with open(base + ".logz", "rb") as f:
+        for block_no in sorted(wanted):
+            offset, length, first = block_table[block_no]
+            f.seek(offset)
+            block_lines = zlib.decompress(f.read(length)).decode("utf-8").split("\n")
+            for rec in wanted[block_no]:
+                results.append((rec[0], tag_names[rec[3]], block_lines[rec[4] - first]))
+    return results
+
+
+def search(tag=None, level=None, pid=None, since=None, until=None, contains=None,
+           last=None, test=None, root=None):
+    root = log_root(root)
+    levels = None
+    if level:
+        # "E" matches errors and above, "=E" matches errors only
+        if level.startswith("="):
+            levels = {logcat_parser.LEVELS.index(c) for c in level[1:]}
+        else:
+            levels = set(range(logcat_parser.LEVELS.index(level), len(logcat_parser.LEVELS)))
+    since_ms = int(since.timestamp() * 1000) if since else None
+    until_ms = int(until.timestamp() * 1000) if until else None
+
+    for entry in runs(root, last=last, test=test):
+        base = os.path.join(root, entry["log"])
+        if not os.path.exists(base + ".idx"):
+            continue
+        for time_ms, tag_name, line in _search_run(base, tag, pid, levels, since_ms, until_ms):
+            if contains and contains not in line:
+                continue
+            yield entry, line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search archived logcat dumps")
+    parser.add_argument("--root", default=None, help=f"Archive root (default: ${LOG_DIR_ENV} or {DEFAULT_LOG_DIR})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    list_cmd = sub.add_parser("list", help="List archived runs")
+    list_cmd.add_argument("--last", type=int, default=None)
+    list_cmd.add_argument("--test", default=None)
+
+    search_cmd = sub.add_parser("search", help="Search archived runs")
+    search_cmd.add_argument("--tag", default=None)
+    search_cmd.add_argument("--level", default=None, help="Minimum level (V/D/I/W/E/F), or =E for exact")
+    search_cmd.add_argument("--pid", type=int, default=None)
+    search_cmd.add_argument("--since", default=None, help="YYYY-MM-DD HH:MM:SS")
+    search_cmd.add_argument("--until", default=None, help="YYYY-MM-DD HH:MM:SS")
+    search_cmd.add_argument("--contains", default=None)
+    search_cmd.add_argument("--last", type=int, default=None, help="Only the last N runs")
+    search_cmd.add_argument("--test", default=None)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for entry in runs(args.root, last=args.last, test=args.test):
+            print(f"{entry['time']}  {entry['test']}  ({entry['lines']} lines)  {entry['log']}")
+        return 0
+
+    parse_time = lambda value: datetime.strptime(value, "%Y-%m-%d %H:%M:%S") if value else None  # noqa: E731
+    start = time.monotonic()
+    count = 0
+    for entry, line in search(args.tag, args.level, args.pid, parse_time(args.since), parse_time(args.until),
+                              args.contains, args.last, args.test, args.root):
+        print(f"[{entry['test']} @ {entry['time']}] {line}")
+        count += 1
+    print(f"{count} match(es) in {time.monotonic() - start:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+# utils/logcat_parser.py
+#
+# Parser for `logcat -v threadtime` output:
+#   MM-DD HH:MM:SS.mmm  PID  TID L TAG: message
+import re
+from array import array
+from datetime import datetime
+
+THREADTIME_RE = re.compile(
+    r"^(\d\d)-(\d\d)\s+(\d\d):(\d\d):(\d\d)\.(\d{3})\s+(\d+)\s+(\d+)\s+([VDIWEFA])\s+(.*?)\s*: (.*)$"
+)
+
+LEVELS = "VDIWEFA"
+
+
+def parse_line(line, year=None):
+    match = THREADTIME_RE.match(line)
+    if not match:
+        return None
+    month, day, hour, minute, second, millis, pid, tid, level, tag, message = match.groups()
+    year = year or datetime.now().year
+    try:
+        stamp = datetime(year, int(month), int(day), int(hour), int(minute), int(second))
+    except ValueError:
+        return None
+    time_ms = int(stamp.timestamp()) * 1000 + int(millis)
+    return time_ms, int(pid), int(tid), level, tag, message
+
+
+class LogFrame:
+    """Columnar view of a logcat dump.
+
+    Numeric columns live in typed arrays and every tag keeps the row numbers
+    it appears on, so filters touch only candidate rows instead of
+    re-matching text.
+    """
+
+    def __init__(self):
+        self.time_ms = array('q')
+        self.pid = array('i')
+        self.tid = array('i')
+        self.level = array('b')
+        self.tag_id = array('I')
+        self.message = []
+        self.tags = []
+        self._tag_ids = {}
+        self._tag_rows = {}
+
+    def __len__(self):
+        return len(self.time_ms)
+
+    def append(self, time_ms, pid, tid, level, tag, message):
+        tag_id = self._tag_ids.get(tag)
+        if tag_id is None:
+            tag_id = self._tag_ids[tag] = len(self.tags)
+            self.tags.append(tag)
+            self._tag_rows[tag_id] = array('I')
+        self._tag_rows[tag_id].append(len(self.time_ms))
+        self.time_ms.append(time_ms)
+        self.pid.append(pid)
+        self.tid.append(tid)
+        self.level.append(LEVELS.index(level))
+        self.tag_id.append(tag_id)
+        self.message.append(message)
+
+    def rows(self, tags=None, min_level=None, pid=None, since_ms=None, until_ms=None):
+        if tags is None:
+            candidates = range(len(self))
+        else:
+            ids = [self._tag_ids[t] for t in tags if t in self._tag_ids]
+            if not ids:
+                return []
+            candidates = self._tag_rows[ids[0]] if len(ids) == 1 else sorted(
+                row for i in ids for row in self._tag_rows[i]
+            )
+
+        level_floor = LEVELS.index(min_level) if min_level else None
+        time_ms, pids, levels = self.time_ms, self.pid, self.level
+        return [
+            row for row in candidates
+            if (level_floor is None or levels[row] >= level_floor)
+            and (pid is None or pids[row] == pid)
+            and (since_ms is None or time_ms[row] >= since_ms)
+            and (until_ms is None or time_ms[row] <= until_ms)
+        ]
+
+    def record(self, row):
+        return (self.time_ms[row], self.pid[row], self.tid[row], LEVELS[self.level[row]],
+                self.tags[self.tag_id[row]], self.message[row])
+
+
+def parse(text, year=None):
+    frame = LogFrame()
+    year = year or datetime.now().year
+    for line in text.splitlines():
+        parsed = parse_line(line, year)
+        if parsed is not None:
+            frame.append(*parsed)
+    return frame
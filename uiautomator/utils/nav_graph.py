@@ -0,0 +1,366 @@
+# utils/nav_graph.py
+#
+# Learned navigation graph for an app.
+#
+# A screen is identified by the resumed activity plus a fingerprint of the
+# stable chrome on it (toolbars, app bars, tabs, search bars), so scrolled
+# lists and changing content cards do not make a known screen look new.
+# Actions taken through a Navigator are timed and recorded as edges between
+# screens. Launches and deep links work from any screen, so they are stored
+# as global edges. Graphs are persisted per app version because screens and
+# ids change between releases.
+#
+# Finding out where the device is starts with one cheap `dumpsys activity`
+# query. A UI dump is only taken when the app is in front and its activity
+# does not match the screen the navigator last left it on. navigate_to(name)
+# then runs Dijkstra over the measured edge costs and walks the path without
+# dumping between steps, checking the resumed activity at the end; when other
+# known screens share the target's activity (single-activity apps), one dump
+# confirms the arrival. If the device is somewhere else, the path is
+# penalised and planned again.
+# A failed dump or an unknown screen falls back to the global edges or the
+# caller's fallback action.
+#
+# Usage:
+#   nav = nav_graph.get_navigator("com.android.vending")
+#   nav.navigate_to("home", fallback=nav_graph.launch("com.android.vending/.MainActivity"))
+import hashlib
+import heapq
+import json
+import os
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+from utils import adb_backend, config, logger, package_inventory, ui_dump
+
+log = logger.setup_logger()
+
+GRAPH_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'nav_graphs'))
+ANY = "*"
+COST_SMOOTHING = 0.3
+MISS_PENALTY = 2.0
+MAX_REPLANS = 2
+
+
+class NavigationError(LookupError):
+    pass
+
+
+# ----------- Actions ----------- #
+# Plain dicts so they can be stored in the graph as they are.
+
+def launch(component):
+    return {"type": "launch", "component": component}
+
+
+def deep_link(uri, package=None):
+    return {"type": "deeplink", "uri": uri, "package": package}
+
+
+def keyevent(code):
+    return {"type": "keyevent", "code": int(code)}
+
+
+def tap(x, y):
+    return {"type": "tap", "x": int(x), "y": int(y)}
+
+
+def text(value):
+    return {"type": "text", "value": value}
+
+
+GLOBAL_ACTIONS = ("launch", "deeplink")
+
+
+def action_command(action):
+    kind = action["type"]
+    if kind == "launch":
+        return ["shell", "am", "start", "-W", "-n", action["component"]]
+    if kind == "deeplink":
+        cmd = ["shell", "am", "start", "-W", "-a", "android.intent.action.VIEW", "-d", f"'{action['uri']}'"]
+        return cmd + (["-p", action["package"]] if action.get("package") else [])
+    if kind == "keyevent":
+        return ["shell", "input", "keyevent", str(action["code"])]
+    if kind == "tap":
+        return ["shell", "input", "tap", str(action["x"]), str(action["y"])]
+    if kind == "text":
+        return ["shell", "input", "text", action["value"]]
+    raise ValueError(f"Unknown navigation action '{kind}'")
+
+
+def action_key(action):
+    return json.dumps(action, sort_keys=True)
+
+
+# ----------- Fingerprints ----------- #
+
+STABLE_ID_RE = re.compile(r"toolbar|action_bar|app_bar|appbar|search_bar|searchbar|tab|bottom_nav|navigation",
+                          re.IGNORECASE)
+RESUMED_RE = re.compile(r"ResumedActivity[:=].*?\s(\S+/\S+?)[\s}]")
+
+
+def parse_resumed_activity(output):
+    match = RESUMED_RE.search(output)
+    return match.group(1) if match else None
+
+
+def fingerprint(activity, root):
+    elements = set()
+    for node in root.iter("node"):
+        res_id = node.attrib.get("resource-id")
+        if res_id and STABLE_ID_RE.search(res_id):
+            elements.add(f"{node.attrib.get('class', '')}#{res_id}")
+    digest = hashlib.sha1("\n".join(sorted(elements)).encode("utf-8")).hexdigest()[:12]
+    return f"{activity}|{digest}"
+
+
+def activity_of(screen):
+    return screen.split("|", 1)[0] if screen else None
+
+
+# ----------- Graph ----------- #
+
+class NavGraph:
+    def __init__(self, package, version):
+        self.package = package
+        self.version = version
+        self.names = {}       # screen name -> fingerprint
+        self.edges = {}       # from fingerprint (or ANY) -> {action key: {"action", "to", "cost"}}
+
+    def path(self):
+        return os.path.join(GRAPH_DIR, f"{self.package}_{self.version}.json")
+
+    @classmethod
+    def load(cls, package, version):
+        graph = cls(package, version)
+        if os.path.exists(graph.path()):
+            with open(graph.path(), encoding="utf-8") as f:
+                data = json.load(f)
+            graph.names = data.get("names", {})
+            graph.edges = data.get("edges", {})
+        return graph
+
+    def save(self):
+        os.makedirs(GRAPH_DIR, exist_ok=True)
+        with open(self.path(), "w", encoding="utf-8") as f:
+            json.dump({"package": self.package, "version": self.version,
+                       "names": self.names, "edges": self.edges}, f, indent=2, sort_keys=True)
+
+    def screens(self):
+        known = set(self.names.values())
+        for source, edges in self.edges.items():
+            if source != ANY:
+                known.add(source)
+            known.update(edge["to"] for edge in edges.values())
+        return known
+
+    def shares_activity(self, screen):
+        # True when another known screen runs in the same activity, as every
+        # screen of a single-activity app does
+        activity = activity_of(screen)
+        return any(other != screen and activity_of(other) == activity for other in self.screens())
+
+    def name_of(self, screen):
+        return next((name for name, fp in self.names.items() if fp == screen), screen)
+
+    def record(self, source, action, target, cost_ms):
+        if action["type"] in GLOBAL_ACTIONS:
+            source = ANY
+        edge = self.edges.setdefault(source, {}).get(action_key(action))
+        if edge is None or edge["to"] != target:
+            self.edges[source][action_key(action)] = {"action": action, "to": target, "cost": cost_ms}
+        else:
+            edge["cost"] = round((1 - COST_SMOOTHING) * edge["cost"] + COST_SMOOTHING * cost_ms)
+
+    def penalise(self, steps):
+        for source, action in steps:
+            edge = self.edges.get(ANY if action["type"] in GLOBAL_ACTIONS else source, {}).get(action_key(action))
+            if edge:
+                edge["cost"] = round(edge["cost"] * MISS_PENALTY)
+
+    def _neighbours(self, screen):
+        seen = set()
+        for source in (screen, ANY):
+            for key, edge in self.edges.get(source, {}).items():
+                if key not in seen:
+                    seen.add(key)
+                    yield source, edge
+
+    def shortest_path(self, source, target):
+        # Dijkstra over measured costs; returns [(from, action, to)] or None
+        best = {source: 0}
+        previous = {}
+        heap = [(0, source)]
+        while heap:
+            cost, screen = heapq.heappop(heap)
+            if screen == target:
+                steps = []
+                while screen != source:
+                    prev, action = previous[screen]
+                    steps.append((prev, action, screen))
+                    screen = prev
+                return steps[::-1]
+            if cost > best.get(screen, float("inf")):
+                continue
+            for _, edge in self._neighbours(screen):
+                total = cost + edge["cost"]
+                if total < best.get(edge["to"], float("inf")):
+                    best[edge["to"]] = total
+                    previous[edge["to"]] = (screen, edge["action"])
+                    heapq.heappush(heap, (total, edge["to"]))
+        return None
+
+
+# ----------- Navigator ----------- #
+
+class Navigator:
+    def __init__(self, package, serial=None):
+        self.package = package
+        self.serial = serial
+        version = package_inventory.get_inventory(serial).version_code(package) or "unknown"
+        self.graph = NavGraph.load(package, version)
+        self.screen = None      # where the last navigation left the device
+        self._lock = threading.Lock()
+
+    def _adb(self):
+        return ["adb", "-s", self.serial] if self.serial else ["adb"]
+
+    def resumed_activity(self):
+        output = adb_backend.run(self._adb() + [
+            "shell", "dumpsys activity activities | grep -m1 ResumedActivity"
+        ]).stdout
+        return parse_resumed_activity(output or "") or "unknown"
+
+    def current(self):
+        activity = self.resumed_activity()
+        if not activity.startswith(self.package + "/"):
+            # Another app or the launcher; only launches and deep links lead out of here
+            return activity
+        if activity_of(self.screen) == activity:
+            return self.screen
+        return self._screen_of(activity)
+
+    def _screen_of(self, activity):
+        try:
+            root = ui_dump.dump(self.serial, f"window_dump_{self.serial or 'default'}.xml")
+        except (ET.ParseError, OSError) as e:
+            # uiautomator cannot dump while the UI never goes idle (animations, video)
+            log.info(f"[Nav] UI dump failed on {activity}: {e}")
+            return activity
+        return fingerprint(activity, root)
+
+    def _arrival(self, target):
+        # Where a walk ended: the target, some other screen or activity, or
+        # None when a shared activity could not be told apart by a dump
+        landed = self.resumed_activity()
+        if landed != activity_of(target):
+            return landed
+        if not self.graph.shares_activity(target):
+            return target
+        screen = self._screen_of(landed)
+        return screen if "|" in screen else None
+
+    def invalidate(self):
+        # Call after driving the app outside the navigator
+        self.screen = None
+
+    def _execute(self, action, settle=False):
+        started = time.monotonic()
+        adb_backend.run(self._adb() + action_command(action))
+        cost = round((time.monotonic() - started) * 1000)
+        # am start -W returns once the launch has drawn; input events need a moment
+        if settle and action["type"] not in GLOBAL_ACTIONS:
+            config.wait("ui_settle", self.serial)
+        return cost
+
+    def perform(self, action):
+        # Take an action and learn the edge it creates
+        with self._lock:
+            source = self.current()
+            cost = self._execute(action, settle=True)
+            self.screen = None
+            target = self.current()
+            self.graph.record(source, action, target, cost)
+            self.graph.save()
+            self.screen = target
+            return target
+
+    def label(self, name, screen=None):
+        with self._lock:
+            self.graph.names[name] = screen or self.current()
+            self.graph.save()
+            return self.graph.names[name]
+
+    def navigate_to(self, name, fallback=None):
+        with self._lock:
+            screen = self.current()
+            target = self.graph.names.get(name)
+            if target is None:
+                if fallback is None:
+                    raise NavigationError(f"Screen '{name}' of {self.package} has not been learned yet")
+                return self._learn(name, screen, fallback)
+
+            for attempt in range(MAX_REPLANS + 1):
+                if screen == target:
+                    self.screen = target
+                    return 0
+                steps = self.graph.shortest_path(screen, target)
+                if steps is None:
+                    break
+                costs = [self._execute(action, settle=i < len(steps) - 1) for i, (_, action, _) in enumerate(steps)]
+                landed = self._arrival(target)
+                if landed == target:
+                    for (source, action, to), cost in zip(steps, costs):
+                        self.graph.record(source, action, to, cost)
+                    self.graph.save()
+                    self.screen = target
+                    log.info(f"[Nav] Reached '{name}' in {len(steps)} step(s)")
+                    return len(steps)
+                self.screen = None
+                if landed is None:
+                    # Right activity but no dump to confirm the screen; do not
+                    # remember a position that was never checked
+                    log.info(f"[Nav] Walked to '{name}' in {len(steps)} step(s), arrival unconfirmed")
+                    return len(steps)
+                log.info(f"[Nav] Expected '{name}', landed on {self.graph.name_of(landed)}; replanning")
+                self.graph.penalise([(source, action) for source, action, _ in steps])
+                self.graph.save()
+                screen = landed if "|" in landed else self.current()
+
+            if fallback is None:
+                raise NavigationError(f"No known path to '{name}' from {self.graph.name_of(screen)}")
+            return self._learn(name, screen, fallback)
+
+    def _learn(self, name, source, fallback):
+        # Take the given action, remember where it leads and name that screen
+        cost = self._execute(fallback)
+        self.screen = None
+        target = self.current()
+        if target.startswith(self.package + "/") and "|" in target:
+            self.graph.record(source, fallback, target, cost)
+            self.graph.names.setdefault(name, target)
+            self.graph.save()
+            log.info(f"[Nav] Learned '{name}' for {self.package} {self.graph.version}")
+        self.screen = target
+        return 1
+
+
+_navigators = {}
+_navigators_lock = threading.Lock()
+
+
+def get_navigator(package, serial=None):
+    with _navigators_lock:
+        key = (package, serial)
+        if key not in _navigators:
+            _navigators[key] = Navigator(package, serial)
+        return _navigators[key]
+
+
+def invalidate_all():
+    # For test helpers that drive the device directly; never creates a navigator
+    with _navigators_lock:
+        for navigator in _navigators.values():
+            navigator.invalidate()
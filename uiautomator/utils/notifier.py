@@ -0,0 +1,240 @@
+# utils/notifier.py
+#
+# PRE/POST job notification emails, sent from a background thread.
+#
+# Callers only put a notice on a bounded queue, so a slow or unreachable mail
+# server never holds up a test run. The sender thread waits `digest_window`
+# seconds after the first notice, groups everything that arrived by recipient
+# and kind, and sends one message per group (a digest when several jobs are
+# in it) over a single SMTP connection that is kept open between batches and
+# dropped after `idle_timeout`.
+#
+# Settings live under `notifications` in config/config.yaml. For local runs
+# point it at a stand-in server, e.g. `python -m aiosmtpd -n -l localhost:1025`.
+import os
+import queue
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+
+from utils import config, logger
+
+log = logger.setup_logger()
+
+PRE, POST = "PRE", "POST"
+QUEUE_SIZE = 1000
+
+
+class Notice:
+    __slots__ = ("kind", "recipient", "job", "passed", "result", "created")
+
+    def __init__(self, kind, recipient, job, passed=None, result=""):
+        self.kind = kind
+        self.recipient = recipient
+        self.job = job
+        self.passed = passed
+        self.result = result
+        self.created = time.time()
+
+
+def job_label(job):
+    return ".".join(part for part in (job.get("module"), job.get("class"), job.get("test")) if part)
+
+
+def compose(sender, recipient, kind, notices):
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = recipient
+    if kind == PRE:
+        if len(notices) == 1:
+            message["Subject"] = f"[UIAutomator] Started: {job_label(notices[0].job)}"
+        else:
+            message["Subject"] = f"[UIAutomator] {len(notices)} jobs started"
+        lines = [f"{time.strftime('%H:%M:%S', time.localtime(n.created))}  {job_label(n.job)} "
+                 f"({n.job.get('method', '')})" for n in notices]
+        message.set_content("\n".join(lines))
+        return message
+
+    failed = sum(1 for n in notices if not n.passed)
+    if len(notices) == 1:
+        verdict = "PASSED" if notices[0].passed else "FAILED"
+        message["Subject"] = f"[UIAutomator] {verdict}: {job_label(notices[0].job)}"
+        message.set_content(notices[0].result)
+        return message
+
+    message["Subject"] = f"[UIAutomator] {len(notices)} jobs finished, {failed} failed"
+    summary = [f"{'PASS' if n.passed else 'FAIL'}  {job_label(n.job)}" for n in notices]
+    details = [n.result for n in notices if not n.passed]
+    body = "\n".join(summary)
+    if details:
+        body += "\n\nFailures:\n\n" + "\n\n".join(details)
+    message.set_content(body)
+    return message
+
+
+class Notifier:
+    def __init__(self, host, port=25, sender="uiautomator@localhost", username=None, password=None,
+                 starttls=False, digest_window=10.0, max_batch=50, idle_timeout=60.0):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.digest_window = digest_window
+        self.max_batch = max_batch
+        self.idle_timeout = idle_timeout
+        self.sent = 0
+        self.dropped = 0
+        self._queue = queue.Queue(QUEUE_SIZE)
+        self._smtp = None
+        self._last_used = 0.0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    # ----------- Producer side ----------- #
+
+    def _put(self, notice):
+        if not self.host or not notice.recipient:
+            return False
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(notice)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            log.error(f"[Notify] Queue full, dropped {notice.kind} notice for {job_label(notice.job)}")
+            return False
+
+    def pre(self, recipient, job):
+        return self._put(Notice(PRE, recipient, job))
+
+    def post(self, recipient, job, passed, result):
+        return self._put(Notice(POST, recipient, job, passed, result))
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="notifier", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=10.0):
+        # Flushes whatever is queued, then closes the connection
+        with self._lock:
+            thread = self._thread
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join(timeout)
+
+    # ----------- Sender thread ----------- #
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.digest_window
+        while len(batch) < self.max_batch:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            try:
+                notice = self._queue.get(timeout=left)
+            except queue.Empty:
+                break
+            if notice is None:
+                # Keep the stop marker for the main loop
+                self._queue.put(None)
+                break
+            batch.append(notice)
+        return batch
+
+    def _loop(self):
+        while True:
+            try:
+                notice = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                self._disconnect()
+                continue
+            if notice is None:
+                self._disconnect()
+                return
+            batch = self._collect(notice)
+            groups = {}
+            for item in batch:
+                groups.setdefault((item.recipient, item.kind), []).append(item)
+            for (recipient, kind), notices in groups.items():
+                self._send(compose(self.sender, recipient, kind, notices))
+
+    def _connect(self):
+        if self._smtp is not None and time.monotonic() - self._last_used < self.idle_timeout:
+            return self._smtp
+        self._disconnect()
+        smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+        if self.starttls:
+            smtp.starttls()
+        if self.username:
+            smtp.login(self.username, self.password or "")
+        self._smtp = smtp
+        self._last_used = time.monotonic()
+        return smtp
+
+    def _disconnect(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._smtp = None
+
+    def _send(self, message):
+        for attempt in range(2):
+            try:
+                self._connect().send_message(message)
+                self._last_used = time.monotonic()
+                self.sent += 1
+                return
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError) as e:
+                # A reused connection may have been closed by the server; reconnect once
+                self._smtp = None
+                if attempt:
+                    log.error(f"[Notify] Could not send '{message['Subject']}': {e}")
+            except smtplib.SMTPException as e:
+                # SMTPException is an OSError too; refused recipients or logins are
+                # permanent, so this has to come before the socket error clause.
+                # The server answered, so the connection is still good to reuse.
+                self._last_used = time.monotonic()
+                log.error(f"[Notify] Could not send '{message['Subject']}': {e}")
+                return
+            except OSError as e:
+                self._smtp = None
+                if attempt:
+                    log.error(f"[Notify] Could not send '{message['Subject']}': {e}")
+
+
+def from_config():
+    settings = config.get("notifications", {}) or {}
+    smtp = settings.get("smtp", {}) or {}
+    return Notifier(
+        host=smtp.get("host"),
+        port=int(smtp.get("port", 25)),
+        sender=smtp.get("sender", "uiautomator@localhost"),
+        username=smtp.get("username") or None,
+        password=os.environ.get("UIAUTOMATOR_SMTP_PASSWORD", smtp.get("password")),
+        starttls=bool(smtp.get("starttls", False)),
+        digest_window=float(settings.get("digest_window", 10)),
+        max_batch=int(settings.get("max_batch", 50)),
+        idle_timeout=float(settings.get("idle_timeout", 60)),
+    )
+
+
+_notifier = None
+_notifier_lock = threading.Lock()
+
+
+def get_notifier():
+    global _notifier
+    with _notifier_lock:
+        if _notifier is None:
+            _notifier = from_config()
+        return _notifier
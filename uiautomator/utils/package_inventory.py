@@ -0,0 +1,191 @@
+# utils/package_inventory.py
+#
+# Per-device cache of installed packages with O(1) lookups.
+#
+# With nothing cached for the device, a refresh parses `pm list packages -f
+# -U --show-versioncode` and, in the same shell call, the `lastUpdateTime` of
+# every package from `dumpsys package`. Later refreshes, including the first
+# one of a new process when the cache on disk is present, only pull those
+# stamps and re-query the packages added or updated since the last look.
+# That dumpsys walks every package and takes a few hundred ms, so refreshes
+# are rate-limited by the TTL; when many packages changed at once a single
+# full listing is cheaper than re-querying them one by one. The cache on disk
+# is keyed by ro.serialno so it never describes a different phone.
+import json
+import os
+import re
+import threading
+import time
+
+from utils import adb_utils, logger
+
+log = logger.setup_logger()
+
+CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'package_cache'))
+DEFAULT_TTL = 30.0
+FULL_RELOAD_THRESHOLD = 20
+
+# package:/data/app/~~x==/com.foo-y==/base.apk=com.foo versionCode:123 uid:10123
+LIST_RE = re.compile(r"^package:(?P<path>.+)=(?P<name>[\w.]+)(?:\s+versionCode:(?P<version>\d+))?(?:\s+uid:(?P<uid>\d+))?\s*$")
+DUMPSYS_PACKAGE_RE = re.compile(r"^\s*Package \[(?P<name>[\w.]+)\]")
+DUMPSYS_UPDATE_RE = re.compile(r"^\s*lastUpdateTime=(?P<stamp>.+?)\s*$")
+
+LIST_COMMAND = "pm list packages -f -U --show-versioncode"
+STAMPS_COMMAND = "dumpsys package packages | grep -E '^  Package \\[|lastUpdateTime='"
+
+
+def parse_package_list(output):
+    packages = {}
+    for line in output.splitlines():
+        match = LIST_RE.match(line.strip())
+        if not match:
+            continue
+        packages[match.group("name")] = {
+            "path": match.group("path"),
+            "version_code": int(match.group("version")) if match.group("version") else None,
+            "uid": int(match.group("uid")) if match.group("uid") else None,
+        }
+    return packages
+
+
+def parse_update_times(output):
+    stamps = {}
+    current = None
+    for line in output.splitlines():
+        match = DUMPSYS_PACKAGE_RE.match(line)
+        if match:
+            current = match.group("name")
+            continue
+        match = DUMPSYS_UPDATE_RE.match(line)
+        if match and current and current not in stamps:
+            stamps[current] = match.group("stamp")
+    return stamps
+
+
+class PackageInventory:
+    def __init__(self, serial=None, ttl=DEFAULT_TTL, persist=True):
+        self.serial = serial
+        self.ttl = ttl
+        self.persist = persist
+        self.packages = {}
+        self.update_times = {}
+        self.refreshed_at = 0.0
+        self.device_id = None
+        self._lock = threading.RLock()
+
+    def _adb(self, cmd_list):
+        return adb_utils.run_adb_command((['-s', self.serial] if self.serial else []) + cmd_list)
+
+    def _cache_path(self):
+        return os.path.join(CACHE_DIR, f"{self.device_id}.json")
+
+    def _identify(self):
+        # adb serials can be reused (emulator-5554, "default"); the hardware serial cannot
+        if self.device_id is None:
+            serialno = self._adb(['shell', 'getprop', 'ro.serialno']).strip()
+            self.device_id = re.sub(r"[^\w.-]", "_", serialno or self.serial or "default")
+            self._load()
+
+    def _load(self):
+        if not self.persist or not os.path.exists(self._cache_path()):
+            return
+        with open(self._cache_path(), encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("device_id") != self.device_id:
+            return
+        self.packages = data.get("packages", {})
+        self.update_times = data.get("update_times", {})
+
+    def _save(self):
+        if not self.persist:
+            return
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(self._cache_path(), "w", encoding="utf-8") as f:
+            json.dump({"device_id": self.device_id, "packages": self.packages, "update_times": self.update_times}, f)
+
+    def _fetch_update_times(self):
+        return parse_update_times(self._adb(['shell', STAMPS_COMMAND]))
+
+    def _fetch_all(self):
+        # Listing and stamps in one shell call; each parser skips the other's lines
+        output = self._adb(['shell', f"{LIST_COMMAND}; {STAMPS_COMMAND}"])
+        return parse_package_list(output), parse_update_times(output)
+
+    def refresh(self, force=False):
+        with self._lock:
+            if not force and self.refreshed_at and time.monotonic() - self.refreshed_at < self.ttl:
+                return {}
+
+            self._identify()
+            if force or not self.packages or not self.update_times:
+                # Nothing to diff against, so no separate stamp query first
+                self.packages, stamps = self._fetch_all()
+                changes = {"full": len(self.packages)}
+            else:
+                stamps = self._fetch_update_times()
+                changed = [name for name, stamp in stamps.items() if self.update_times.get(name) != stamp]
+                if not stamps or len(changed) > FULL_RELOAD_THRESHOLD:
+                    self.packages = parse_package_list(self._adb(['shell', LIST_COMMAND]))
+                    changes = {"full": len(self.packages)}
+                else:
+                    removed = [name for name in self.packages if name not in stamps]
+                    for name in removed:
+                        self.packages.pop(name, None)
+                    for name in changed:
+                        # pm filters by substring, keep only the exact match
+                        found = parse_package_list(self._adb(['shell', f"{LIST_COMMAND} {name}"]))
+                        if name in found:
+                            self.packages[name] = found[name]
+                    changes = {"removed": removed, "changed": changed}
+                    if removed or changed:
+                        log.info(f"[Packages] {len(changed)} changed, {len(removed)} removed")
+
+            self.update_times = stamps
+            self.refreshed_at = time.monotonic()
+            self._save()
+            return changes
+
+    def invalidate(self, package=None):
+        with self._lock:
+            if package is None:
+                self.refreshed_at = 0.0
+            else:
+                # Forget the stamp so the next refresh re-queries this package
+                self.update_times.pop(package, None)
+                self.refreshed_at = 0.0
+
+    def is_installed(self, package):
+        self.refresh()
+        return package in self.packages
+
+    def version_code(self, package):
+        self.refresh()
+        info = self.packages.get(package)
+        return info["version_code"] if info else None
+
+    def path(self, package):
+        self.refresh()
+        info = self.packages.get(package)
+        return info["path"] if info else None
+
+    def names(self):
+        self.refresh()
+        return sorted(self.packages)
+
+    def __len__(self):
+        self.refresh()
+        return len(self.packages)
+
+    def __contains__(self, package):
+        return self.is_installed(package)
+
+
+_inventories = {}
+_inventories_lock = threading.Lock()
+
+
+def get_inventory(serial=None):
+    with _inventories_lock:
+        if serial not in _inventories:
+            _inventories[serial] = PackageInventory(serial)
+        return _inventories[serial]
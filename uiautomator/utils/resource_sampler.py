@@ -0,0 +1,257 @@
+# utils/resource_sampler.py
+#
+# Background sampler for device CPU, memory, battery and thermal state.
+#
+# One `adb shell` stays open for the whole sampling window and every tick
+# writes a single probe script into it, so a sample costs one round trip and
+# no process spawns on host or device. A reader thread feeds its output into
+# a queue so a wedged shell times out instead of blocking the sampler.
+# Samples go into a preallocated array-backed ring buffer.
+#
+# pytest: run with --resource-sampling=<seconds> and every test gets a
+# "resource_samples" entry in its user_properties (and the JUnit XML).
+import contextlib
+import json
+import math
+import os
+import queue
+import subprocess
+import threading
+import time
+from array import array
+from datetime import datetime
+
+import pytest
+
+from utils import adb_backend, config, logger
+
+log = logger.setup_logger()
+
+REPORT_DIR = os.path.join(config.get_path("paths.reports_dir", "reports"), "resources")
+DEFAULT_INTERVAL = 2.0
+DEFAULT_CAPACITY = 1800
+PROBE_TIMEOUT = 10.0
+
+COLUMNS = ("time", "cpu_pct", "mem_total_kb", "mem_available_kb", "battery_level", "battery_temp_c", "thermal_max_c")
+
+# /proc/meminfo and `dumpsys battery` are used rather than `dumpsys meminfo`
+# and `dumpsys batterystats`: both of those take seconds and load the device
+# they are supposed to be observing.
+PROBE_SCRIPT = (
+    "head -1 /proc/stat; "
+    "grep -E '^(MemTotal|MemAvailable):' /proc/meminfo; "
+    "dumpsys battery | grep -E '^ +(level|temperature):'; "
+    "cat /sys/class/thermal/thermal_zone*/temp 2>/dev/null | sed 's/^/thermal: /'"
+)
+END_MARK = "__uia_sample_end__"
+
+
+class SampleRing:
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.columns = {name: array('d', [math.nan]) * capacity for name in COLUMNS}
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, sample):
+        with self._lock:
+            for name in COLUMNS:
+                self.columns[name][self._next] = sample.get(name, math.nan)
+            self._next = (self._next + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def series(self):
+        with self._lock:
+            start = (self._next - self._count) % self.capacity
+            rows = []
+            for i in range(self._count):
+                idx = (start + i) % self.capacity
+                row = {}
+                for name in COLUMNS:
+                    value = self.columns[name][idx]
+                    row[name] = None if math.isnan(value) else round(value, 3)
+                rows.append(row)
+            return rows
+
+
+def parse_probe(lines, previous_cpu=None):
+    sample = {"time": time.time()}
+    cpu = None
+    thermal = []
+    for line in lines:
+        line = line.strip()
+        if line.startswith("cpu "):
+            cpu = [int(v) for v in line.split()[1:]]
+        elif line.startswith("MemTotal:"):
+            sample["mem_total_kb"] = float(line.split()[1])
+        elif line.startswith("MemAvailable:"):
+            sample["mem_available_kb"] = float(line.split()[1])
+        elif line.startswith("level:"):
+            sample["battery_level"] = float(line.split(":", 1)[1])
+        elif line.startswith("temperature:"):
+            # dumpsys battery reports tenths of a degree
+            sample["battery_temp_c"] = float(line.split(":", 1)[1]) / 10
+        elif line.startswith("thermal:"):
+            value = line.split(":", 1)[1].strip()
+            if value.lstrip("-").isdigit():
+                # thermal zones report millidegrees on most kernels, degrees on a few
+                value = int(value)
+                thermal.append(value / 1000 if abs(value) > 1000 else value)
+
+    if cpu and previous_cpu:
+        idle = (cpu[3] + cpu[4]) - (previous_cpu[3] + previous_cpu[4])
+        total = sum(cpu) - sum(previous_cpu)
+        if total > 0:
+            sample["cpu_pct"] = 100.0 * (total - idle) / total
+    if thermal:
+        sample["thermal_max_c"] = max(thermal)
+    return sample, cpu
+
+
+class PersistentShell:
+    def __init__(self, serial=None, timeout=PROBE_TIMEOUT):
+        cmd = ["adb", "-s", serial, "shell"] if serial else ["adb", "shell"]
+        self.timeout = timeout
+        self.proc = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding='utf-8', errors='replace', bufsize=1
+        )
+        self._lines = queue.Queue()
+        self._reader = threading.Thread(target=self._read, name="resource-sampler-reader", daemon=True)
+        self._reader.start()
+
+    def _read(self):
+        for line in self.proc.stdout:
+            self._lines.put(line)
+        self._lines.put(None)
+
+    def run(self, script):
+        self.proc.stdin.write(f"{script}; echo {END_MARK}\n")
+        self.proc.stdin.flush()
+        expires = time.monotonic() + self.timeout
+        lines = []
+        while True:
+            try:
+                line = self._lines.get(timeout=max(0.0, expires - time.monotonic()))
+            except queue.Empty:
+                raise TimeoutError(f"adb shell returned no sample within {self.timeout:.0f}s") from None
+            if line is None:
+                raise RuntimeError("adb shell closed while sampling")
+            if line.strip() == END_MARK:
+                return lines
+            lines.append(line)
+
+    def close(self):
+        try:
+            self.proc.stdin.write("exit\n")
+            self.proc.stdin.flush()
+            self.proc.wait(timeout=2)
+        except Exception:
+            self.proc.kill()
+
+
+class OneShotShell:
+    # Used when recording or replaying so samples go through the adb backend
+    def __init__(self, serial=None):
+        self.prefix = ["adb", "-s", serial] if serial else ["adb"]
+
+    def run(self, script):
+        return adb_backend.run(self.prefix + ["shell", f"{script}; echo {END_MARK}"]).stdout.splitlines()
+
+    def close(self):
+        pass
+
+
+class ResourceSampler:
+    def __init__(self, interval=DEFAULT_INTERVAL, capacity=DEFAULT_CAPACITY, serial=None):
+        self.interval = interval
+        self.serial = serial
+        self.ring = SampleRing(capacity)
+        self._stop = threading.Event()
+        self._thread = None
+        self._shell = None
+
+    def start(self):
+        try:
+            if adb_backend.get_backend().name == "real":
+                self._shell = PersistentShell(self.serial)
+            else:
+                self._shell = OneShotShell(self.serial)
+        except OSError as e:
+            # Sampling is best-effort; never take the test down with it
+            log.error(f"[Sampler] Could not open adb shell: {e}")
+            return self
+        self._thread = threading.Thread(target=self._loop, name="resource-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def _loop(self):
+        previous_cpu = None
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                sample, previous_cpu = parse_probe(self._shell.run(PROBE_SCRIPT), previous_cpu)
+                self.ring.append(sample)
+            except Exception as e:
+                log.error(f"[Sampler] Sampling stopped: {e}")
+                return
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            # A probe gives up after PROBE_TIMEOUT, so the loop is done before the shell closes
+            self._thread.join(timeout=self.interval + PROBE_TIMEOUT + 1)
+        if self._shell is not None:
+            self._shell.close()
+        return self.ring.series()
+
+    def summary(self):
+        series = self.ring.series()
+        result = {"samples": len(series)}
+        for name in COLUMNS[1:]:
+            values = [row[name] for row in series if row[name] is not None]
+            if values:
+                result[name] = {"min": min(values), "max": max(values), "mean": round(sum(values) / len(values), 2)}
+        return result
+
+
+@contextlib.contextmanager
+def sampling(name=None, interval=DEFAULT_INTERVAL, serial=None):
+    sampler = ResourceSampler(interval, serial=serial).start()
+    try:
+        yield sampler
+    finally:
+        series = sampler.stop()
+        if name:
+            os.makedirs(REPORT_DIR, exist_ok=True)
+            path = os.path.join(REPORT_DIR, f"{name}_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"summary": sampler.summary(), "series": series}, f)
+            log.info(f"[Sampler] {len(series)} samples for {name} saved to {path}")
+
+
+# ----------- pytest plugin ----------- #
+
+def pytest_addoption(parser):
+    parser.getgroup("adb").addoption(
+        "--resource-sampling", type=float, default=None, metavar="SECONDS",
+        help="Sample device CPU/memory/battery/thermal every SECONDS during each test",
+    )
+
+
+@pytest.fixture(autouse=True)
+def resource_samples(request):
+    interval = request.config.getoption("--resource-sampling")
+    if not interval:
+        yield None
+        return
+    sampler = ResourceSampler(interval).start()
+    yield sampler
+    series = sampler.stop()
+    request.node.user_properties.append(("resource_summary", json.dumps(sampler.summary())))
+    request.node.user_properties.append(("resource_samples", json.dumps(series)))
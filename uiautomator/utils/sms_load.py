@@ -0,0 +1,262 @@
+# utils/sms_load.py
+#
+# Rate-controlled SMS load generator.
+#
+# Each device gets a sender thread that fires SENDTO intents at a target rate
+# and taps a send button located once per device (one UI dump per run instead
+# of one per message). A tracker thread per device follows the SMS provider
+# through sms_verify's incremental cursor and moves every message through
+# queued -> sent -> delivered.
+#
+#   open loop   - messages are issued on a fixed schedule regardless of
+#                 completions; lag behind the schedule is reported
+#   closed loop - at most `window` messages per device are outstanding
+#                 (queued but not yet seen as sent); the rate is an optional cap
+import csv
+import itertools
+import os
+import shlex
+import threading
+import time
+from datetime import datetime
+
+from utils import adb_backend, config, logger, sms_verify, stats, ui_dump
+
+log = logger.setup_logger()
+
+REPORT_DIR = config.get_path("paths.reports_dir", "reports")
+POLL_INTERVAL = 0.5
+SENT_TIMEOUT = 60.0
+DELIVERY_TIMEOUT = 120.0
+
+QUEUED, SENT, DELIVERED, FAILED = "queued", "sent", "delivered", "failed"
+PROBE_BODY = "probe"
+
+
+class LoadMessage:
+    __slots__ = ("serial", "recipient", "body", "tag", "state", "queued_at", "sent_at",
+                 "delivered_at", "sms_id", "schedule_lag")
+
+    def __init__(self, serial, recipient, body, tag):
+        self.serial = serial
+        self.recipient = recipient
+        self.body = body
+        self.tag = tag
+        self.state = QUEUED
+        self.queued_at = None
+        self.sent_at = None
+        self.delivered_at = None
+        self.sms_id = None
+        self.schedule_lag = 0.0
+
+
+def _adb(serial):
+    return ["adb", "-s", serial] if serial else ["adb"]
+
+
+def locate_send_button(serial, recipient):
+    # Open a compose screen once and remember where its send button is
+    adb_backend.run(_adb(serial) + [
+        "shell", "am", "start", "-a", "android.intent.action.SENDTO",
+        "-d", f"sms:{recipient}", "--es", "sms_body", PROBE_BODY
+    ])
+    config.wait("launch_settle", serial)
+    root = ui_dump.dump(serial, f"window_dump_{serial or 'default'}.xml")
+    center = ui_dump.find_center(root, ui_dump.is_send_button)
+    # Erase the probe text before backing out, otherwise Messages keeps it as a draft
+    erase = " ".join(["123"] + ["67"] * len(PROBE_BODY))
+    adb_backend.run(_adb(serial) + ["shell", f"input keyevent {erase}; input keyevent 4 4"])
+    if center is None:
+        raise RuntimeError(f"Send button not found on device {serial or 'default'}")
+    return center
+
+
+def send_one(message, send_button):
+    x, y = send_button
+    script = (
+        f"am start -a android.intent.action.SENDTO -d sms:{message.recipient} "
+        f"--es sms_body {shlex.quote(message.body)} --ez exit_on_sent true >/dev/null; "
+        f"sleep {config.timing('intent_settle', message.serial)}; input tap {x} {y}"
+    )
+    adb_backend.run(_adb(message.serial) + ["shell", script])
+
+
+class DeliveryTracker:
+    def __init__(self, serial):
+        self.serial = serial
+        self.pending = {}
+        self.verifier = sms_verify.SmsVerifier(serial)
+        self._lock = threading.Lock()
+
+    def track(self, message):
+        with self._lock:
+            self.pending[message.tag] = message
+
+    def fail(self, message):
+        # Sender threads and the poller both move messages along; state changes hold the lock
+        with self._lock:
+            message.state = FAILED
+
+    def poll(self):
+        with self._lock:
+            if not self.pending:
+                return
+            waiting = list(self.pending.values())
+
+        rows = self.verifier.fetch()
+        now = time.monotonic()
+        by_tag = {m.tag: m for m in waiting}
+        with self._lock:
+            for row in rows:
+                tag = next((t for t in by_tag if t in row["body"]), None)
+                if tag is None:
+                    continue
+                message = by_tag[tag]
+                if message.state == QUEUED and row["type"] == sms_verify.TYPE_SENT:
+                    message.state, message.sent_at, message.sms_id = SENT, now, row["id"]
+                    # Delivery reports update the row in place, keep re-reading it
+                    self.verifier.watch(row["id"])
+                if row["type"] == sms_verify.TYPE_FAILED or row["status"] >= sms_verify.STATUS_FAILED:
+                    message.state = FAILED
+                elif row["status"] == sms_verify.STATUS_COMPLETE and message.state == SENT:
+                    message.state, message.delivered_at = DELIVERED, now
+
+            for message in waiting:
+                age = now - message.queued_at
+                if message.state == QUEUED and age > SENT_TIMEOUT:
+                    message.state = FAILED
+                if message.state in (DELIVERED, FAILED) or (message.state == SENT and age > DELIVERY_TIMEOUT):
+                    self.pending.pop(message.tag, None)
+                    if message.sms_id:
+                        self.verifier.unwatch(message.sms_id)
+
+    def outstanding(self):
+        with self._lock:
+            return sum(1 for m in self.pending.values() if m.state == QUEUED)
+
+
+class LoadRun:
+    def __init__(self, serials, recipients, rate, count, mode="open", window=3, body="Load test"):
+        if mode not in ("open", "closed"):
+            raise ValueError("mode must be 'open' or 'closed'")
+        if rate is not None and rate < 0:
+            raise ValueError("rate cannot be negative")
+        if mode == "open" and not rate:
+            raise ValueError("open loop needs a positive rate")
+        if mode == "closed" and window < 1:
+            raise ValueError("closed loop needs a window of at least 1")
+        self.serials = list(serials) or [None]
+        self.recipients = list(recipients)
+        self.rate = rate
+        self.count = count
+        self.mode = mode
+        self.window = window
+        self.body = body
+        self.run_id = datetime.now().strftime("%H%M%S")
+        self.messages = []
+        self._done = threading.Event()
+
+    def _messages_for(self, index, serial):
+        per_device = self.count // len(self.serials) + (1 if index < self.count % len(self.serials) else 0)
+        recipients = itertools.cycle(self.recipients)
+        result = []
+        for seq in range(per_device):
+            tag = f"[L{self.run_id}-{index}-{seq}]"
+            result.append(LoadMessage(serial, next(recipients), f"{self.body} {tag}", tag))
+        return result
+
+    def _sender(self, serial, messages, tracker, send_button):
+        # Closed loop without a rate cap is paced by the window alone
+        interval = len(self.serials) / self.rate if self.rate else 0.0
+        start = time.monotonic()
+        for i, message in enumerate(messages):
+            if self.mode == "open":
+                due = start + i * interval
+                wait = due - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                message.schedule_lag = max(0.0, -wait)
+            else:
+                while tracker.outstanding() >= self.window:
+                    time.sleep(POLL_INTERVAL / 2)
+                # Still honour the rate cap in closed loop
+                wait = start + i * interval - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+            message.queued_at = time.monotonic()
+            tracker.track(message)
+            try:
+                send_one(message, send_button)
+            except Exception as e:
+                log.error(f"[Load] Send failed on {serial or 'default'}: {e}")
+                tracker.fail(message)
+
+    def _poller(self, trackers):
+        while not self._done.is_set() or any(t.pending for t in trackers):
+            for tracker in trackers:
+                try:
+                    tracker.poll()
+                except Exception as e:
+                    log.error(f"[Load] Poll failed on {tracker.serial or 'default'}: {e}")
+            time.sleep(POLL_INTERVAL)
+
+    def run(self):
+        trackers = []
+        senders = []
+        started = time.monotonic()
+        for index, serial in enumerate(self.serials):
+            messages = self._messages_for(index, serial)
+            self.messages.extend(messages)
+            tracker = DeliveryTracker(serial)
+            trackers.append(tracker)
+            send_button = locate_send_button(serial, self.recipients[0])
+            senders.append(threading.Thread(
+                target=self._sender, args=(serial, messages, tracker, send_button), daemon=True
+            ))
+
+        poller = threading.Thread(target=self._poller, args=(trackers,), daemon=True)
+        poller.start()
+        for thread in senders:
+            thread.start()
+        for thread in senders:
+            thread.join()
+        issued = time.monotonic()
+        self._done.set()
+        poller.join()
+        return self.report(started, issued)
+
+    def report(self, started, issued):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        sent = [m for m in self.messages if m.sent_at]
+        delivered = [m for m in self.messages if m.delivered_at]
+        return {
+            "mode": self.mode,
+            "target_rate": self.rate,
+            "devices": len(self.serials),
+            "messages": len(self.messages),
+            "sent": len(sent),
+            "delivered": len(delivered),
+            "failed": sum(1 for m in self.messages if m.state == FAILED),
+            "issue_rate": round(len(self.messages) / max(issued - started, 1e-6), 3),
+            "sent_throughput": round(len(sent) / elapsed, 3),
+            "delivered_throughput": round(len(delivered) / elapsed, 3),
+            "queued_to_sent_ms": stats.summarize([round((m.sent_at - m.queued_at) * 1000) for m in sent]),
+            "queued_to_delivered_ms": stats.summarize(
+                [round((m.delivered_at - m.queued_at) * 1000) for m in delivered]
+            ),
+            "schedule_lag_ms": stats.summarize([round(m.schedule_lag * 1000) for m in self.messages]),
+        }
+
+    def write_csv(self):
+        os.makedirs(REPORT_DIR, exist_ok=True)
+        path = os.path.join(REPORT_DIR, f"sms_load_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Device", "Recipient", "Tag", "State", "Queued->Sent (ms)", "Queued->Delivered (ms)"])
+            for m in self.messages:
+                writer.writerow([
+                    m.serial or "default", m.recipient, m.tag, m.state,
+                    round((m.sent_at - m.queued_at) * 1000) if m.sent_at else "",
+                    round((m.delivered_at - m.queued_at) * 1000) if m.delivered_at else "",
+                ])
+        return path
@@ -0,0 +1,185 @@
+# utils/sms_verify.py
+#
+# Send verification against the SMS content provider.
+#
+# Every device keeps an `_id` cursor, so each poll is a single indexed query
+# for rows newer than the last one seen, plus the rows still in the outbox
+# (their type changes in place when they leave it). Expected messages are
+# matched on recipient, a hash of the body and a timestamp window.
+import hashlib
+import re
+import threading
+import time
+
+from utils import adb_backend, config, logger
+
+log = logger.setup_logger()
+
+# Telephony.TextBasedSmsColumns.MESSAGE_TYPE_*
+TYPE_SENT = 2
+TYPE_OUTBOX = 4
+TYPE_FAILED = 5
+TYPE_QUEUED = 6
+IN_FLIGHT = (TYPE_OUTBOX, TYPE_QUEUED)
+
+# Telephony.TextBasedSmsColumns.STATUS_*
+STATUS_COMPLETE = 0
+STATUS_FAILED = 64
+
+SENT, PENDING, FAILED, MISSING = "sent", "pending", "failed", "missing"
+
+DEFAULT_WINDOW = 300.0
+
+ROW_RE = re.compile(
+    r"_id=(?P<id>\d+), address=(?P<address>.*?), date=(?P<date>\d+), type=(?P<type>\d+), "
+    r"status=(?P<status>-?\d+), body=(?P<body>.*)$"
+)
+
+
+def normalize_number(number):
+    digits = re.sub(r"\D", "", number or "")
+    # Compare national numbers so +91XXXXXXXXXX matches XXXXXXXXXX
+    return digits[-10:]
+
+
+def body_hash(body):
+    return hashlib.sha1((body or "").strip().encode("utf-8")).hexdigest()
+
+
+class Expectation:
+    __slots__ = ("recipient", "body_hash", "sent_after", "row", "result")
+
+    def __init__(self, recipient, body, sent_after):
+        self.recipient = normalize_number(recipient)
+        self.body_hash = body_hash(body)
+        self.sent_after = sent_after
+        self.row = None
+        self.result = MISSING
+
+
+class SmsVerifier:
+    def __init__(self, serial=None, window=DEFAULT_WINDOW):
+        self.serial = serial
+        self.window = window
+        self.rows = {}
+        self._index = {}
+        self._in_flight = set()
+        self._watched = set()
+        self._lock = threading.Lock()
+        self.last_seen = self._max_id()
+
+    def _adb(self):
+        return ["adb", "-s", self.serial] if self.serial else ["adb"]
+
+    def _query(self, where, sort=None):
+        cmd = self._adb() + [
+            "shell", "content", "query", "--uri", "content://sms",
+            "--projection", "_id:address:date:type:status:body", "--where", f"'{where}'"
+        ]
+        if sort:
+            cmd += ["--sort", f"'{sort}'"]
+        return adb_backend.run(cmd).stdout
+
+    def _max_id(self):
+        match = re.search(r"_id=(\d+)", self._query("_id>0", "_id DESC LIMIT 1"))
+        return int(match.group(1)) if match else 0
+
+    def watch(self, sms_id):
+        # Keep re-reading a row already past the cursor, e.g. to see its delivery status
+        with self._lock:
+            self._watched.add(sms_id)
+
+    def unwatch(self, sms_id):
+        with self._lock:
+            self._watched.discard(sms_id)
+
+    def fetch(self):
+        with self._lock:
+            revisit = sorted(self._in_flight | self._watched)
+            where = f"_id>{self.last_seen}"
+        if revisit:
+            where += f" OR _id IN ({','.join(map(str, revisit))})"
+
+        changed = []
+        for line in self._query(where, "_id ASC").splitlines():
+            match = ROW_RE.search(line)
+            if not match:
+                continue
+            row = {
+                "id": int(match.group("id")),
+                "address": match.group("address"),
+                "date": int(match.group("date")) / 1000.0,
+                "type": int(match.group("type")),
+                "status": int(match.group("status")),
+                "body": match.group("body"),
+            }
+            changed.append(row)
+
+        with self._lock:
+            for row in changed:
+                self.rows[row["id"]] = row
+                key = (normalize_number(row["address"]), body_hash(row["body"]))
+                ids = self._index.setdefault(key, [])
+                if row["id"] not in ids:
+                    ids.append(row["id"])
+                if row["type"] in IN_FLIGHT:
+                    self._in_flight.add(row["id"])
+                else:
+                    self._in_flight.discard(row["id"])
+                self.last_seen = max(self.last_seen, row["id"])
+        return changed
+
+    def expect(self, recipient, body, sent_after=None):
+        return Expectation(recipient, body, time.time() if sent_after is None else sent_after)
+
+    def _resolve(self, expectation, claimed):
+        with self._lock:
+            candidates = self._index.get((expectation.recipient, expectation.body_hash), [])
+            for sms_id in candidates:
+                row = self.rows[sms_id]
+                if sms_id in claimed:
+                    continue
+                # Device and host clocks differ, so the window is deliberately loose
+                if abs(row["date"] - expectation.sent_after) > self.window:
+                    continue
+                expectation.row = row
+                if row["type"] == TYPE_SENT and row["status"] != STATUS_FAILED:
+                    expectation.result = SENT
+                elif row["type"] == TYPE_FAILED or row["status"] == STATUS_FAILED:
+                    expectation.result = FAILED
+                else:
+                    expectation.result = PENDING
+                claimed.add(sms_id)
+                return
+
+    def verify_all(self, expectations, timeout=None, poll_interval=None):
+        timeout = config.timing("sms_verify_timeout", self.serial) if timeout is None else timeout
+        poll_interval = config.timing("sms_poll", self.serial) if poll_interval is None else poll_interval
+        deadline = time.monotonic() + timeout
+        while True:
+            self.fetch()
+            claimed = set()
+            for expectation in expectations:
+                expectation.row, expectation.result = None, MISSING
+                self._resolve(expectation, claimed)
+            unsettled = [e for e in expectations if e.result in (MISSING, PENDING)]
+            if not unsettled or time.monotonic() >= deadline:
+                return [e.result for e in expectations]
+            adb_backend.settle(poll_interval)
+            if not adb_backend.is_live():
+                # Replay serves the same rows again; waiting will not change them
+                return [e.result for e in expectations]
+
+    def verify(self, expectation, timeout=None, poll_interval=None):
+        return self.verify_all([expectation], timeout, poll_interval)[0]
+
+
+_verifiers = {}
+_verifiers_lock = threading.Lock()
+
+
+def get_verifier(serial=None):
+    with _verifiers_lock:
+        if serial not in _verifiers:
+            _verifiers[serial] = SmsVerifier(serial)
+        return _verifiers[serial]
@@ -0,0 +1,195 @@
+# utils/state_scheduler.py
+#
+# Device-state-aware test ordering.
+#
+# Tests declare the device state they need and the state they leave behind:
+#
+#     @pytest.mark.device_state(requires={"bluetooth": "off"}, leaves={"bluetooth": "on"})
+#
+# Collection is reordered (within each module) so consecutive tests chain
+# their states, and ensure() only issues a transition command when the
+# tracked state differs from the required one.
+import threading
+
+import pytest
+
+from utils import adb_utils, logger
+
+log = logger.setup_logger()
+
+UNKNOWN = None
+
+_transitions = {}
+
+
+def register_transition(key, value, cmd_list):
+    _transitions[(key, value)] = cmd_list
+
+
+class DeviceStateTracker:
+    def __init__(self):
+        self._state = {}
+        self._lock = threading.Lock()
+        self.transitions_run = 0
+
+    def get(self, key):
+        with self._lock:
+            return self._state.get(key, UNKNOWN)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._state)
+
+    def update(self, values):
+        with self._lock:
+            self._state.update(values)
+
+    def invalidate(self, keys=None):
+        with self._lock:
+            if keys is None:
+                self._state.clear()
+            else:
+                for key in keys:
+                    self._state.pop(key, None)
+
+    def ensure(self, required):
+        for key, value in (required or {}).items():
+            if self.get(key) == value:
+                log.info(f"[State] {key} already {value}, skipping transition")
+                continue
+            cmd = _transitions.get((key, value))
+            if cmd is None:
+                raise KeyError(f"No transition registered for {key}={value}")
+            log.info(f"[State] {key} -> {value}")
+            adb_utils.run_adb_command(cmd)
+            self.transitions_run += 1
+            self.update({key: value})
+
+
+tracker = DeviceStateTracker()
+
+
+def declared_state(obj):
+    # Works for pytest items and for plain (bound) test functions
+    if hasattr(obj, "get_closest_marker"):
+        marker = obj.get_closest_marker("device_state")
+    else:
+        func = getattr(obj, "__func__", obj)
+        marks = [m for m in getattr(func, "pytestmark", []) if m.name == "device_state"]
+        marker = marks[0] if marks else None
+    if marker is None:
+        return None
+    return marker.kwargs.get("requires", {}), marker.kwargs.get("leaves", {})
+
+
+def _cost(requires, state):
+    return sum(1 for key, value in requires.items() if state.get(key, UNKNOWN) != value)
+
+
+def order(entries, initial_state=None):
+    """Greedy nearest-neighbour ordering of (entry, (requires, leaves)) pairs.
+
+    At every step the pending test needing the fewest transitions from the
+    current state runs next; ties keep the original order. Tests without a
+    declaration leave the state unknown, so they are scheduled last.
+    """
+    state = dict(initial_state or {})
+    pending = list(entries)
+    ordered = []
+    while pending:
+        best = None
+        for idx, (_, decl) in enumerate(pending):
+            cost = _cost(decl[0], state) if decl is not None else float("inf")
+            if best is None or cost < best[0]:
+                best = (cost, idx)
+        entry, decl = pending.pop(best[1])
+        ordered.append(entry)
+        if decl is None:
+            state = {}
+        else:
+            state.update(decl[0])
+            state.update(decl[1])
+    return ordered
+
+
+def count_transitions(entries, initial_state=None):
+    state = dict(initial_state or {})
+    total = 0
+    for _, decl in entries:
+        if decl is None:
+            state = {}
+            continue
+        total += _cost(decl[0], state)
+        state.update(decl[0])
+        state.update(decl[1])
+    return total
+
+
+# ----------- pytest plugin ----------- #
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "device_state(requires=None, leaves=None): device state a test needs and the state it leaves",
+    )
+
+
+def pytest_addoption(parser):
+    parser.getgroup("adb").addoption(
+        "--no-state-ordering", action="store_true", default=False,
+        help="Keep collection order instead of minimising device state transitions",
+    )
+
+
+def pytest_collection_modifyitems(session, config, items):
+    if config.getoption("--no-state-ordering"):
+        return
+
+    # Only reorder inside a module so module/class fixtures are not torn down repeatedly
+    groups = []
+    for item in items:
+        if groups and groups[-1][0] == item.module:
+            groups[-1][1].append(item)
+        else:
+            groups.append((item.module, [item]))
+
+    reordered = []
+    before = after = 0
+    for _, group in groups:
+        entries = [(item, declared_state(item)) for item in group]
+        if all(decl is None for _, decl in entries):
+            reordered.extend(group)
+            continue
+        new_order = order(entries)
+        decls = dict((id(item), decl) for item, decl in entries)
+        before += count_transitions(entries)
+        after += count_transitions([(item, decls[id(item)]) for item in new_order])
+        reordered.extend(new_order)
+
+    items[:] = reordered
+    if before:
+        log.info(f"[State] Reordered collection: {before} -> {after} state transitions")
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    report = outcome.get_result()
+    setattr(item, f"rep_{report.when}", report)
+
+
+@pytest.fixture
+def device_state(request):
+    decl = declared_state(request.node)
+    if decl is not None:
+        tracker.ensure(decl[0])
+    yield tracker
+
+    report = getattr(request.node, "rep_call", None)
+    if decl is None:
+        # Undeclared tests may touch anything; force the next ensure() to act
+        tracker.invalidate()
+    elif report is None or not report.passed:
+        tracker.invalidate(set(decl[0]) | set(decl[1]))
+    else:
+        tracker.update(decl[1])
@@ -1,18 +1,29 @@
+import ast
 import os
-import re
 
 TEST_DIR = os.path.join(os.path.dirname(__file__), '..', 'tests')
 
-def fetch_testcases(module_name):
+def fetch_test_tree(module_name):
+    # [(class_name or None, [test names])] in source order, None = module-level tests
     file_path = os.path.join(TEST_DIR, f"{module_name}.py")
-    
+
     if not os.path.exists(file_path):
         return []
-    
+
     with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+        tree = ast.parse(f.read(), filename=file_path)
+
+    groups = []
+    module_tests = [node.name for node in tree.body
+                    if isinstance(node, ast.FunctionDef) and node.name.startswith("test_")]
+    if module_tests:
+        groups.append((None, module_tests))
+
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            tests = [item.name for item in node.body
+                     if isinstance(item, ast.FunctionDef) and item.name.startswith("test_")]
+            if tests:
+                groups.append((node.name, tests))
 
-    # Match function names starting with test_
-    test_cases = re.findall(r"def (test_[a-zA-Z0-9_]+)\s*\(", content)
-    
-    return sorted(set(test_cases))
+    return groups
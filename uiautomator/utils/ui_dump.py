@@ -0,0 +1,40 @@
+# utils/ui_dump.py
+import re
+import xml.etree.ElementTree as ET
+
+from utils import adb_backend
+
+REMOTE_DUMP = "/sdcard/window_dump.xml"
+
+
+def _adb(serial):
+    return ["adb", "-s", serial] if serial else ["adb"]
+
+
+def dump(serial=None, local_path="window_dump.xml"):
+    adb_backend.run(_adb(serial) + ["shell", "uiautomator", "dump", REMOTE_DUMP])
+    adb_backend.run(_adb(serial) + ["pull", REMOTE_DUMP, local_path])
+    return ET.parse(local_path).getroot()
+
+
+def node_center(node):
+    coords = re.findall(r"\d+", node.attrib.get("bounds", ""))
+    if len(coords) != 4:
+        return None
+    x1, y1, x2, y2 = map(int, coords)
+    return (x1 + x2) // 2, (y1 + y2) // 2
+
+
+def is_send_button(node):
+    res_id = node.attrib.get("resource-id", "").lower()
+    text = node.attrib.get("text", "").lower()
+    return "send" in res_id or text == "send"
+
+
+def find_center(root, predicate):
+    for node in root.iter("node"):
+        if predicate(node):
+            center = node_center(node)
+            if center:
+                return center
+    return None